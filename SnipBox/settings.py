@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -44,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'admin_apps.app_snippet.instrumentation.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -84,6 +86,41 @@ DATABASES = {
     }
 }
 
+# SNIPBOX_DB_MODE=production keeps connections open across requests and runs SQLite in WAL
+# mode, so readers no longer wait for the writer. It also adds a read-only 'replica' alias
+# that the read endpoints use. By default the replica is the same file; point
+# SNIPBOX_REPLICA_NAME at a replicated copy to move those reads off the primary.
+SNIPBOX_DB_MODE = os.environ.get('SNIPBOX_DB_MODE', 'development')
+
+if SNIPBOX_DB_MODE == 'production':
+    SQLITE_PRAGMAS = ';'.join([
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        'PRAGMA busy_timeout=5000',
+        'PRAGMA mmap_size=268435456',
+        'PRAGMA cache_size=-20000',
+        'PRAGMA temp_store=MEMORY',
+    ])
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': SQLITE_PRAGMAS,
+            # Writers take the lock at BEGIN and queue on busy_timeout, instead of failing with
+            # "database is locked" when two of them try to upgrade a read lock at once
+            'transaction_mode': 'IMMEDIATE',
+        },
+    })
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ.get('SNIPBOX_REPLICA_NAME', DATABASES['default']['NAME']),
+        'OPTIONS': {'init_command': SQLITE_PRAGMAS + ';PRAGMA query_only=ON'},
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['admin_apps.app_snippet.routers.ReplicaRouter']
+SNIPPET_REPLICA_DATABASE = 'replica'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -128,7 +165,11 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'admin_apps.app_snippet.authentication.CachedJWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'admin_apps.app_snippet.renderers.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
 }
 
@@ -137,4 +178,57 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
 }
 
-BASE_URL='http://127.0.0.1:8000/'
\ No newline at end of file
+BASE_URL='http://127.0.0.1:8000/'
+
+# Keyset pagination for the snippet list endpoints
+SNIPPET_PAGE_SIZE = 50
+SNIPPET_MAX_PAGE_SIZE = 500
+
+# Bounded, process-local tag title -> id cache used when resolving snippet tags
+SNIPPET_TAG_CACHE_SIZE = 10000
+
+# NDJSON bulk import: valid records committed per transaction, and per-line errors reported
+SNIPPET_BULK_IMPORT_CHUNK_SIZE = 1000
+SNIPPET_BULK_IMPORT_MAX_ERRORS = 100
+
+# Rows read per database round trip by the streaming export
+SNIPPET_EXPORT_CHUNK_SIZE = 2000
+
+# Response cache for the snippet read endpoints, invalidated by bumping generation keys
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'snipbox',
+    }
+}
+SNIPPET_RESPONSE_CACHE_ALIAS = 'default'
+SNIPPET_RESPONSE_CACHE_TIMEOUT = 300
+
+# `manage.py serve` runs several worker processes, which must all see each other's generation
+# bumps, so production mode keeps the response cache on disk instead of in process memory
+if SNIPBOX_DB_MODE == 'production':
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('SNIPBOX_CACHE_DIR', BASE_DIR / 'cache'),
+    }
+
+# How long deleted snippets stay visible to the sync feed (purge with `manage.py purge_tombstones`)
+SNIPPET_TOMBSTONE_RETENTION = timedelta(days=30)
+
+# Per-request instrumentation (Server-Timing headers, /api/snippet/perf-stats/)
+SNIPPET_SLOW_REQUEST_MS = 500
+SNIPPET_PERF_WINDOW = 1000
+
+# In-process cache of authenticated users (CachedJWTAuthentication), TTL in seconds
+SNIPPET_AUTH_USER_CACHE_SIZE = 10000
+SNIPPET_AUTH_USER_CACHE_TTL = 30
+
+# Notes from this size (UTF-8 bytes) up are stored zlib compressed; list endpoints return at
+# most this many characters of a note, on request (`note_preview`)
+SNIPPET_NOTE_COMPRESS_MIN_BYTES = 1024
+SNIPPET_NOTE_PREVIEW_MAX = 1000
+
+# Tag autocomplete: in-memory prefix index reloaded after this many seconds, results per request
+SNIPPET_TAG_INDEX_TTL = 300
+SNIPPET_TAG_AUTOCOMPLETE_LIMIT = 10
+SNIPPET_TAG_AUTOCOMPLETE_MAX = 50
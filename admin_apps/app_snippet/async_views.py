@@ -0,0 +1,155 @@
+# async_views.py
+import json
+
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException, ValidationError
+
+from .authentication import CachedJWTAuthentication
+from .counters import aget_snippet_count
+from .models import *
+from .pagination import InvalidCursor, KeysetPaginator
+from .routers import replica_reads
+from .serializers import *
+from .tags import filter_by_tags, parse_tag_query
+from .views import generate_api_response, get_fields_param, get_list_param, get_preview_param, get_scalar_param
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncAPIView(View):
+    """
+    Base for the native async read views: authenticates the JWT before dispatching to an
+    async handler, so a slow client never pins a worker thread. Every query goes to the replica.
+    """
+    async def dispatch(self, request, *args, **kwargs):
+        with replica_reads():
+            try:
+                result = await CachedJWTAuthentication().aauthenticate(request)
+            except APIException as error:
+                return JsonResponse({"detail": error.detail}, status=error.status_code)
+            if result is None:
+                return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+            request.user, request.auth = result
+            return await super().dispatch(request, *args, **kwargs)
+
+
+async def fetch_page(paginator, queryset):
+    return paginator.build_page([snippet async for snippet in paginator.get_page_queryset(queryset)])
+
+
+class AsyncOverviewAPI(AsyncAPIView):
+    """
+    Async version of OverviewAPI
+    """
+    async def get(self, request):
+        try:
+            paginator = KeysetPaginator(request.GET)
+            preview = get_preview_param(request.GET)
+            fields = get_fields_param(request.GET, SNIPPET_LINK_FIELDS)
+            page = await fetch_page(paginator, snippet_link_rows(Snippet.objects.all(), preview, fields))
+        except InvalidCursor:
+            return JsonResponse(generate_api_response(False, [], "Invalid cursor"), status=400)
+        except ValidationError as error:
+            return JsonResponse(generate_api_response(False, [], str(error.detail[0])), status=400)
+        if page.items:
+            data = {
+            "total_count": await aget_snippet_count(),
+            "snippets": serialize_snippet_links(page.items, preview, fields),
+            "next": page.next_cursor,
+            "previous": page.previous_cursor,
+            }
+            response_data = generate_api_response(True, data, "successfully retrieved snippet list with links")
+        else:
+            response_data = generate_api_response(False, [], "No data found")
+        return JsonResponse(response_data, status=200)
+
+
+class AsyncDetailSnippetAPI(AsyncAPIView):
+    """
+    Async version of DetailSnippetAPI
+    """
+    async def get(self, request, snippet_id):
+        try:
+            fields = get_fields_param(request.GET, SnippetSerializerDetail.Meta.fields)
+        except ValidationError as error:
+            return JsonResponse(generate_api_response(False, [], str(error.detail[0])), status=400)
+        queryset = sparse_snippets(Snippet.objects.filter(id=snippet_id, created_by=request.user), fields)
+        snippet = [snippet async for snippet in queryset]
+        if snippet:
+            serializer = SnippetSerializerDetail(snippet, many=True, fields=fields)
+            response_data = generate_api_response(True, serializer.data, "successfully retrieved snippet details")
+        else:
+            response_data = generate_api_response(False, [], "No data found")
+        return JsonResponse(response_data, status=200)
+
+
+class AsyncTagListAPI(AsyncAPIView):
+    """
+    Async version of TagListAPI
+    """
+    async def get(self, request):
+        try:
+            fields = get_fields_param(request.GET, TagSerializer.Meta.fields)
+        except ValidationError as error:
+            return JsonResponse(generate_api_response(False, [], str(error.detail[0])), status=400)
+        tags = [tag async for tag in Tag.objects.only(*fields)]
+        if tags:
+            response_data = generate_api_response(
+                True, TagSerializer(tags, many=True, fields=fields).data, "successfully retrieved tags list")
+        else:
+            response_data = generate_api_response(False, [], "No data found")
+        return JsonResponse(response_data, status=200)
+
+
+class AsyncFilterByTagAPI(AsyncAPIView):
+    """
+    Async version of FilterByTagAPI
+    """
+    async def post(self, request):
+        try:
+            body = json.loads(request.body or b'{}')
+        except ValueError:
+            body = None
+        if not isinstance(body, dict):
+            return JsonResponse(generate_api_response(False, [], "Invalid JSON body"), status=400)
+
+        try:
+            required = get_list_param(body, 'all')
+            optional = get_list_param(body, 'any')
+            groups = [optional] if optional else []
+            excluded = get_list_param(body, 'none')
+            if get_scalar_param(body, 'tag'):
+                required.append(body.get('tag'))
+            if get_scalar_param(body, 'query'):
+                parsed = parse_tag_query(str(body.get('query')))
+                required, groups, excluded = required + parsed[0], groups + parsed[1], excluded + parsed[2]
+        except ValidationError as error:
+            return JsonResponse(generate_api_response(False, [], str(error.detail[0])), status=400)
+        if not (required or groups):
+            return JsonResponse(generate_api_response(False, [], "No tag available"), status=400)
+
+        try:
+            paginator = KeysetPaginator(body)
+            preview = get_preview_param(body)
+            fields = get_fields_param(body, SNIPPET_DETAIL_FIELDS)
+            snippet = filter_by_tags(
+                Snippet.objects.filter(created_by=request.user), required, groups, excluded)
+            page = await fetch_page(paginator, snippet_detail_rows(snippet, preview, fields))
+        except InvalidCursor:
+            return JsonResponse(generate_api_response(False, [], "Invalid cursor"), status=400)
+        except ValidationError as error:
+            return JsonResponse(generate_api_response(False, [], str(error.detail[0])), status=400)
+        if not page.items:
+            return JsonResponse(generate_api_response(False, [], "No snippets available"), status=400)
+        titles = {}
+        if 'tag' in fields:
+            pairs = tag_titles_queryset([row.id for row in page.items])
+            titles = group_tag_titles([pair async for pair in pairs])
+        data = {
+        "snippets": serialize_snippet_details(page.items, titles, preview, fields),
+        "next": page.next_cursor,
+        "previous": page.previous_cursor,
+        }
+        return JsonResponse(generate_api_response(True, data, "Snippet list for given tag"), status=200)
@@ -0,0 +1,96 @@
+# authentication.py
+import copy
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache import get_user_version
+from .instrumentation import TimedAuthenticationMixin
+from .utils import LRUCache
+
+# "user id:version" -> User, shared by the requests of this process, see CachedJWTAuthentication
+user_cache = LRUCache(
+    getattr(settings, 'SNIPPET_AUTH_USER_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'SNIPPET_AUTH_USER_CACHE_TTL', 30),
+)
+
+
+class AsyncJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication with an awaitable counterpart of authenticate(). Token validation is
+    pure CPU work, only the user lookup touches the database and it uses the async ORM.
+    """
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+    def check_user(self, user, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+        return user
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+        return self.check_user(user, validated_token)
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+
+class CachedJWTAuthentication(TimedAuthenticationMixin, AsyncJWTAuthentication):
+    """
+    Serve the token's user from a bounded in-process cache instead of loading it on every
+    request. Entries are keyed on the user's version in the shared response cache, which saving
+    or deleting a user bumps, so a deactivation applies at once in every process. The active
+    check (and the password one, if CHECK_REVOKE_TOKEN is enabled) still runs on each request.
+    Writes that skip the signals, such as QuerySet.update(), must call bump_user_version().
+    """
+    def cache_key(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        return f'{user_id}:{get_user_version(user_id)}'
+
+    def get_user(self, validated_token):
+        key = self.cache_key(validated_token)
+        user = user_cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set_many({key: user})
+            return copy.copy(user)
+        return self.check_user(copy.copy(user), validated_token)
+
+    async def aget_user(self, validated_token):
+        key = self.cache_key(validated_token)
+        user = user_cache.get(key)
+        if user is None:
+            user = await super().aget_user(validated_token)
+            user_cache.set_many({key: user})
+            return copy.copy(user)
+        return self.check_user(copy.copy(user), validated_token)
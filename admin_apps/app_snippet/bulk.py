@@ -0,0 +1,86 @@
+# bulk.py
+import json
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from .models import Snippet
+from .search import index_snippets
+from .serializers import SnippetSerializer
+from .tags import resolve_tag_ids
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_MAX_ERRORS = 100
+
+
+def iter_lines(stream):
+    """
+    Yield (line number, raw line) from a file-like request stream without buffering the body.
+    """
+    if stream is None:
+        return
+    for number, line in enumerate(iter(stream.readline, b''), start=1):
+        if line.strip():
+            yield number, line
+
+
+def insert_chunk(user, records):
+    """
+    Insert validated snippet records and their tag links with a fixed number of queries.
+    """
+    with transaction.atomic():
+        snippets = Snippet.objects.bulk_create(
+            [Snippet(title=data['title'], note=data['note'], created_by=user) for data in records])
+        index_snippets(snippets)
+        titles = [title for data in records for title in data.get('tag', [])]
+        tag_ids = dict(zip(dict.fromkeys(titles), resolve_tag_ids(titles)))
+        Through = Snippet.tag.through
+        Through.objects.bulk_create([
+            Through(snippet_id=snippet.id, tag_id=tag_ids[title])
+            for snippet, data in zip(snippets, records)
+            for title in dict.fromkeys(data.get('tag', []))
+        ])
+    return len(snippets)
+
+
+def import_ndjson(stream, user):
+    """
+    Validate and insert one snippet per NDJSON line, committing every
+    SNIPPET_BULK_IMPORT_CHUNK_SIZE valid records so memory and transaction size stay bounded.
+    """
+    chunk_size = getattr(settings, 'SNIPPET_BULK_IMPORT_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    max_errors = getattr(settings, 'SNIPPET_BULK_IMPORT_MAX_ERRORS', DEFAULT_MAX_ERRORS)
+    created, failed, errors, chunk = 0, 0, [], []
+    # Building a serializer's fields is far more expensive than validating a record,
+    # so one instance validates every line.
+    validator = SnippetSerializer()
+
+    for number, line in iter_lines(stream):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record, line_errors = None, {'non_field_errors': ['Invalid JSON.']}
+        else:
+            line_errors = None if isinstance(record, dict) else {
+                'non_field_errors': ['Expected a JSON object.']}
+        if not line_errors:
+            try:
+                validated_data = validator.run_validation(record)
+            except ValidationError as exc:
+                line_errors = exc.detail
+
+        if line_errors:
+            failed += 1
+            if len(errors) < max_errors:
+                errors.append({'line': number, 'errors': line_errors})
+            continue
+
+        chunk.append(validated_data)
+        if len(chunk) >= chunk_size:
+            created += insert_chunk(user, chunk)
+            chunk = []
+
+    if chunk:
+        created += insert_chunk(user, chunk)
+    return {'created': created, 'failed': failed, 'errors': errors}
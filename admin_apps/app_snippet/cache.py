@@ -0,0 +1,135 @@
+# cache.py
+import hashlib
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+GLOBAL_SCOPE = 'global'
+USER_SCOPE = 'user'
+
+DEFAULT_TIMEOUT = 300
+
+
+def get_response_cache():
+    return caches[getattr(settings, 'SNIPPET_RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def generation_key(user_id=None):
+    if user_id is None:
+        return 'snipbox:gen:global'
+    return f'snipbox:gen:user:{user_id}'
+
+
+def get_generation(key):
+    """
+    Current generation for `key`. A missing (never set or evicted) generation starts from the
+    clock, so it can never fall back to a value that older cache entries were stored under.
+    """
+    cache = get_response_cache()
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def increment_generation(key):
+    cache = get_response_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def bump_generation(user_id=None):
+    """
+    Invalidate every cached response of the given user, plus the global ones, in O(1).
+    """
+    increment_generation(generation_key())
+    if user_id is not None:
+        increment_generation(generation_key(user_id))
+
+
+def user_version_key(user_id):
+    return f'snipbox:gen:auth:{user_id}'
+
+
+def get_user_version(user_id):
+    return get_generation(user_version_key(user_id))
+
+
+def bump_user_version(user_id):
+    """
+    Invalidate the user in the authentication cache of every process sharing the response cache.
+    """
+    increment_generation(user_version_key(user_id))
+
+
+class CacheStats:
+    """
+    Hit and miss counters of the response cache lookups made by this process. They live in
+    memory rather than in the cache, where every lookup would cost a write.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = Counter()
+
+    def record(self, stat):
+        with self.lock:
+            self.counts[stat] += 1
+
+    def clear(self):
+        with self.lock:
+            self.counts.clear()
+
+    def snapshot(self):
+        with self.lock:
+            hits, misses = self.counts['hits'], self.counts['misses']
+        lookups = hits + misses
+        return {'hits': hits, 'misses': misses, 'hit_ratio': hits / lookups if lookups else 0.0}
+
+
+cache_stats = CacheStats()
+
+
+def response_cache_key(scope, request, validator=None):
+    if scope == USER_SCOPE:
+        owner = request.user.pk
+        generation = get_generation(generation_key(owner))
+    else:
+        owner = ''
+        generation = get_generation(generation_key())
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'snipbox:response:{scope}:{owner}:{generation}:{validator or ""}:{path}'
+
+
+def cache_response(scope, validator=None):
+    """
+    Cache the data of successful responses of a view method until the next write bumps the
+    generation of `scope`: GLOBAL_SCOPE for data shared by every user, USER_SCOPE otherwise.
+    A view that sends an ETag passes its `validator` function, whose value keys the entry too,
+    so a write committed before its generation bump cannot pair a new ETag with an old body.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            cache = get_response_cache()
+            key = response_cache_key(
+                scope, request, validator(request, *args, **kwargs) if validator else None)
+            cached = cache.get(key)
+            if cached is not None:
+                cache_stats.record('hits')
+                return Response(cached)
+            cache_stats.record('misses')
+            response = method(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                timeout = getattr(settings, 'SNIPPET_RESPONSE_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+                cache.set(key, response.data, timeout)
+            return response
+        return wrapper
+    return decorator
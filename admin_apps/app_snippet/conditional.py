@@ -0,0 +1,84 @@
+# conditional.py
+import hashlib
+
+from django.db.models import Count, F, Func, Max, Subquery
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from .counters import counters_maintained
+from .models import Snippet, SnippetCounter, SnippetTombstone
+
+
+def make_etag(request, *parts):
+    raw = ':'.join(str(part) for part in (request.get_full_path(), *parts))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def memoize_on_request(func):
+    """
+    condition() asks for the ETag and Last-Modified separately, share one query between them.
+    """
+    attr = f'_snipbox_{func.__name__}'
+
+    def wrapper(request, *args, **kwargs):
+        if not hasattr(request, attr):
+            setattr(request, attr, func(request, *args, **kwargs))
+        return getattr(request, attr)
+    return wrapper
+
+
+def newest(queryset, field):
+    # A bare MAX() subquery, which SQLite answers from the end of an index
+    return Subquery(queryset.order_by().values(newest=Func(F(field), function='MAX')))
+
+
+# Tags only change through the serializer and bulk import paths, which also set
+# updated_at, so max(updated_at) covers tag changes as well. Deletions leave
+# updated_at alone, so the newest tombstone is folded into the same statement.
+# Where the counters are maintained the count is read from SnippetCounter and
+# every other value is an index seek, so the cost does not grow with the table.
+@memoize_on_request
+def overview_state(request):
+    last_deleted = SnippetTombstone.objects.order_by('-deleted_at').values('deleted_at')[:1]
+    state = None
+    if counters_maintained():
+        state = SnippetCounter.objects.filter(user_id=SnippetCounter.ALL_USERS).values(
+            count=F('snippet_count'), last_updated=newest(Snippet.objects, 'updated_at'),
+            last_id=newest(Snippet.objects, 'id'), last_deleted=Subquery(last_deleted)).first()
+    if state is None:
+        state = Snippet.objects.aggregate(
+            count=Count('id'), last_updated=Max('updated_at'), last_id=Max('id'),
+            last_deleted=Max(Subquery(last_deleted)))
+    moments = [state['last_updated'], state['last_deleted']]
+    state['last_modified'] = max((moment for moment in moments if moment), default=None)
+    return state
+
+
+@memoize_on_request
+def detail_state(request, snippet_id):
+    return Snippet.objects.filter(
+        id=snippet_id, created_by=request.user).values_list('updated_at', flat=True).first()
+
+
+def overview_etag(request):
+    state = overview_state(request)
+    return make_etag(request, state['count'], state['last_modified'], state['last_id'])
+
+
+def overview_last_modified(request):
+    return overview_state(request)['last_modified']
+
+
+def detail_etag(request, snippet_id):
+    updated_at = detail_state(request, snippet_id)
+    return make_etag(request, updated_at) if updated_at else None
+
+
+def detail_last_modified(request, snippet_id):
+    return detail_state(request, snippet_id)
+
+
+overview_condition = method_decorator(
+    condition(etag_func=overview_etag, last_modified_func=overview_last_modified))
+detail_condition = method_decorator(
+    condition(etag_func=detail_etag, last_modified_func=detail_last_modified))
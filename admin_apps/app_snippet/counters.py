@@ -0,0 +1,65 @@
+# counters.py
+from django.db import connection, transaction
+from django.db.models import Count
+
+from .models import Snippet, SnippetCounter
+
+
+def counters_maintained():
+    # The triggers that keep SnippetCounter up to date only exist on SQLite, see migration 0007
+    return connection.vendor == 'sqlite'
+
+
+def get_snippet_count(user_id=SnippetCounter.ALL_USERS):
+    """
+    Return the number of snippets of `user_id`, or of all users, in one primary key lookup.
+    """
+    if not counters_maintained():
+        snippets = Snippet.objects.all()
+        if user_id != SnippetCounter.ALL_USERS:
+            snippets = snippets.filter(created_by_id=user_id)
+        return snippets.count()
+    return SnippetCounter.objects.filter(user_id=user_id).values_list('snippet_count', flat=True).first() or 0
+
+
+async def aget_snippet_count(user_id=SnippetCounter.ALL_USERS):
+    if not counters_maintained():
+        snippets = Snippet.objects.all()
+        if user_id != SnippetCounter.ALL_USERS:
+            snippets = snippets.filter(created_by_id=user_id)
+        return await snippets.acount()
+    return await SnippetCounter.objects.filter(
+        user_id=user_id).values_list('snippet_count', flat=True).afirst() or 0
+
+
+def count_snippets():
+    """
+    Count the snippet table: user id -> number of snippets, ALL_USERS included.
+    """
+    counts = dict(Snippet.objects.order_by().values_list('created_by_id').annotate(Count('id')))
+    counts[SnippetCounter.ALL_USERS] = sum(counts.values())
+    return counts
+
+
+def verify_counters():
+    """
+    Return (user_id, stored, actual) for every counter that disagrees with the table.
+    """
+    actual = count_snippets()
+    stored = dict(SnippetCounter.objects.values_list('user_id', 'snippet_count'))
+    return sorted(
+        (user_id, stored.get(user_id, 0), actual.get(user_id, 0))
+        for user_id in stored.keys() | actual.keys()
+        if stored.get(user_id, 0) != actual.get(user_id, 0))
+
+
+def rebuild_counters():
+    """
+    Recount every counter from the snippet table, atomically, and return how many were written.
+    """
+    with transaction.atomic():
+        counts = count_snippets()
+        SnippetCounter.objects.all().delete()
+        SnippetCounter.objects.bulk_create(
+            SnippetCounter(user_id=user_id, snippet_count=count) for user_id, count in counts.items())
+    return len(counts)
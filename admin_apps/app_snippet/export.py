@@ -0,0 +1,57 @@
+# export.py
+import csv
+import json
+
+from django.conf import settings
+from rest_framework import serializers
+
+from .models import Snippet
+
+DEFAULT_CHUNK_SIZE = 2000
+EXPORT_FIELDS = ['id', 'title', 'note', 'created_at', 'updated_at', 'tag']
+
+
+class Echo:
+    """
+    File-like object whose write() hands the line back, so csv.writer can feed a generator.
+    """
+    def write(self, value):
+        return value
+
+
+def iter_snippet_rows(user, using=None):
+    """
+    Yield one dict per snippet owned by `user`, reading SNIPPET_EXPORT_CHUNK_SIZE rows at a
+    time from the `using` database and fetching the tags of each chunk with one extra query.
+    """
+    chunk_size = getattr(settings, 'SNIPPET_EXPORT_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    datetime_field = serializers.DateTimeField()
+    queryset = Snippet.objects.using(using).filter(created_by=user).order_by('id').prefetch_related('tag')
+    for snippet in queryset.iterator(chunk_size=chunk_size):
+        yield {
+            'id': snippet.id,
+            'title': snippet.title,
+            'note': snippet.note,
+            'created_at': datetime_field.to_representation(snippet.created_at),
+            'updated_at': datetime_field.to_representation(snippet.updated_at),
+            'tag': [tag.title for tag in snippet.tag.all()],
+        }
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row) + '\n'
+
+
+def iter_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        row['tag'] = ','.join(row['tag'])
+        yield writer.writerow([row[field] for field in EXPORT_FIELDS])
+
+
+EXPORT_FORMATS = {
+    'ndjson': iter_ndjson,
+    'csv': iter_csv,
+}
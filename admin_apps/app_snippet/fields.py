@@ -0,0 +1,88 @@
+# fields.py
+import zlib
+
+from django.conf import settings
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+DEFAULT_COMPRESS_MIN_BYTES = 1024
+
+# Every stored value starts with one of these, followed by the UTF-8 text as is or zlib'ed
+PLAIN = b'\x00'
+COMPRESSED = b'\x01'
+
+
+def compress_note(text):
+    data = text.encode()
+    if len(data) >= getattr(settings, 'SNIPPET_NOTE_COMPRESS_MIN_BYTES', DEFAULT_COMPRESS_MIN_BYTES):
+        compressed = zlib.compress(data)
+        if len(compressed) < len(data):
+            return COMPRESSED + compressed
+    return PLAIN + data
+
+
+def decompress_note(value):
+    """
+    Return the text of a stored note. Rows written before notes were compressed hold text.
+    """
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    if value[:1] == COMPRESSED:
+        return zlib.decompress(value[1:]).decode()
+    return value[1:].decode()
+
+
+def preview_note(value, length):
+    """
+    Return the first `length` characters of a stored note, decompressing only as much as needed.
+    """
+    if value is None or isinstance(value, str):
+        return value[:length] if value else value
+    value = bytes(value)
+    # A character is at most 4 bytes in UTF-8
+    if value[:1] == COMPRESSED:
+        data = zlib.decompressobj().decompress(value[1:], length * 4)
+    else:
+        data = value[1:length * 4 + 1]
+    return data.decode(errors='ignore')[:length]
+
+
+class CompressedTextDescriptor(DeferredAttribute):
+    """
+    Keeps the stored bytes on the instance and decompresses them on first access, so rows
+    whose note is never read never pay for it. Saving an untouched note writes the bytes back.
+    """
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if isinstance(value, (bytes, memoryview)):
+            value = decompress_note(value)
+            instance.__dict__[self.field.attname] = value
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+
+class CompressedTextField(models.TextField):
+    """
+    Text stored as bytes, zlib compressed from SNIPPET_NOTE_COMPRESS_MIN_BYTES up. Model
+    instances see text; values() and values_list() return the stored bytes, read them with
+    decompress_note() or preview_note().
+    """
+    descriptor_class = CompressedTextDescriptor
+
+    def get_internal_type(self):
+        return 'BinaryField'
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if value is None or isinstance(value, (bytes, memoryview)):
+            return value
+        return connection.Database.Binary(compress_note(str(value)))
+
+    def from_db_value(self, value, expression, connection):
+        if isinstance(value, memoryview):
+            return bytes(value)
+        return value
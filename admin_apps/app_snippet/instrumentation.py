@@ -0,0 +1,204 @@
+# instrumentation.py
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOW_REQUEST_MS = 500
+DEFAULT_WINDOW = 1000
+HISTOGRAM_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+TIMINGS = ('auth', 'serialize', 'render')
+
+current_metrics = ContextVar('snipbox_request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = []
+        self.db_time = 0.0
+        self.timings = dict.fromkeys(TIMINGS, 0.0)
+        self.active = set()
+
+
+@contextmanager
+def timed(name):
+    """
+    Add the time spent in the block to the current request's `name` timing. Nested blocks
+    of the same name (a serializer inside a list serializer) are only counted once.
+    """
+    metrics = current_metrics.get()
+    if metrics is None or name in metrics.active:
+        yield
+        return
+    metrics.active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] += time.perf_counter() - started
+        metrics.active.discard(name)
+
+
+def time_query(execute, sql, params, many, context):
+    """
+    connection.execute_wrapper() hook, installed on every connection when it is created.
+    Queries run outside an instrumented request cost one ContextVar lookup.
+    """
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        metrics.db_time += duration
+        metrics.queries.append((duration, sql))
+
+
+def install_query_timer(connection):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+class TimedSerializerMixin:
+    def to_representation(self, instance):
+        with timed('serialize'):
+            return super().to_representation(instance)
+
+
+class TimedAuthenticationMixin:
+    def authenticate(self, request):
+        with timed('auth'):
+            return super().authenticate(request)
+
+
+class TimedRendererMixin:
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('render'):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class RouteStats:
+    """
+    Rolling latency window per route, plus the most recent slow requests.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = defaultdict(self.new_window)
+        self.slow = deque(maxlen=50)
+
+    def new_window(self):
+        return deque(maxlen=getattr(settings, 'SNIPPET_PERF_WINDOW', DEFAULT_WINDOW))
+
+    def add(self, route, total_ms, queries):
+        with self.lock:
+            self.routes[route].append((total_ms, queries))
+
+    def add_slow(self, entry):
+        with self.lock:
+            self.slow.append(entry)
+
+    def clear(self):
+        with self.lock:
+            self.routes.clear()
+            self.slow.clear()
+
+    def snapshot(self):
+        with self.lock:
+            routes = {route: list(window) for route, window in self.routes.items()}
+            slow = list(self.slow)
+        return {'routes': {route: summarize(samples) for route, samples in routes.items()}, 'slow_requests': slow}
+
+
+def summarize(samples):
+    latencies = sorted(total for total, _ in samples)
+    pick = lambda fraction: latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+    histogram = {}
+    for bound in HISTOGRAM_BUCKETS_MS:
+        histogram[f'le_{bound}ms'] = sum(1 for latency in latencies if latency <= bound)
+    histogram['total'] = len(latencies)
+    return {
+        'count': len(latencies),
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'p50_ms': round(pick(0.50), 3),
+        'p95_ms': round(pick(0.95), 3),
+        'p99_ms': round(pick(0.99), 3),
+        'mean_queries': round(sum(queries for _, queries in samples) / len(samples), 2),
+        'histogram': histogram,
+    }
+
+
+route_stats = RouteStats()
+
+
+class PerformanceMiddleware:
+    """
+    Measure every request: query count and DB time, JWT auth, serializer and renderer time.
+    Adds a Server-Timing header, feeds the per-route stats and logs slow requests with their
+    most expensive SQL.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token, started = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics, started)
+
+    async def __acall__(self, request):
+        metrics, token, started = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics, started)
+
+    def start(self):
+        metrics = RequestMetrics()
+        return metrics, current_metrics.set(metrics), time.perf_counter()
+
+    def finish(self, request, response, metrics, started):
+        total_ms = (time.perf_counter() - started) * 1000
+        to_ms = lambda seconds: seconds * 1000
+        parts = [f'db;dur={to_ms(metrics.db_time):.2f};desc="{len(metrics.queries)} queries"']
+        parts += [f'{name};dur={to_ms(metrics.timings[name]):.2f}' for name in TIMINGS]
+        parts.append(f'total;dur={total_ms:.2f}')
+        response['Server-Timing'] = ', '.join(parts)
+
+        match = getattr(request, 'resolver_match', None)
+        route = f'{request.method} /{match.route}' if match and match.route else f'{request.method} <unresolved>'
+        route_stats.add(route, total_ms, len(metrics.queries))
+
+        if total_ms >= getattr(settings, 'SNIPPET_SLOW_REQUEST_MS', DEFAULT_SLOW_REQUEST_MS):
+            worst = sorted(metrics.queries, key=lambda query: query[0], reverse=True)[:3]
+            entry = {
+                'route': route,
+                'path': request.get_full_path(),
+                'total_ms': round(total_ms, 3),
+                'db_ms': round(to_ms(metrics.db_time), 3),
+                'queries': len(metrics.queries),
+                'worst_sql': [{'ms': round(to_ms(duration), 3), 'sql': sql[:1000]} for duration, sql in worst],
+            }
+            route_stats.add_slow(entry)
+            logger.warning('Slow request %s %.1fms (%d queries, %.1fms in DB), worst SQL: %s',
+                           entry['path'], total_ms, entry['queries'], entry['db_ms'],
+                           entry['worst_sql'][0]['sql'] if worst else '-')
+        return response
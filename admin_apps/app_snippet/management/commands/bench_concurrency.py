@@ -0,0 +1,115 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from admin_apps.app_snippet.management.commands.bench_snippets import ROUTES, Command as BenchCommand, percentile
+from admin_apps.app_snippet.routers import get_replica_alias
+
+
+class Command(BaseCommand):
+    help = ('Run reader and writer threads against the snippet API at the same time and report '
+            'latency, throughput and "database is locked" failures of each side as JSON. Compare '
+            'runs with and without SNIPBOX_DB_MODE=production.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100, help='Requests per thread.')
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--read-routes', nargs='+', default=['overview-api', 'snippet-details-api'])
+        parser.add_argument('--write-routes', nargs='+', default=['create-snippet-api', 'update-snippet-api'])
+        parser.add_argument('--username', default='bench',
+                            help='Staff user the requests run as, created for the run and deleted afterwards.')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        unknown = set(options['read_routes'] + options['write_routes']) - set(ROUTES)
+        if unknown:
+            raise CommandError(f'Unknown routes: {", ".join(sorted(unknown))}')
+        if options['readers'] + options['writers'] < 1:
+            raise CommandError('At least one reader or writer is required')
+
+        bench = BenchCommand()
+        ctx = bench.prepare(dict(options, requests=0))
+        results = {'read': [], 'write': []}
+        failures = []
+        lock = threading.Lock()
+
+        def worker(kind, routes):
+            client = bench.make_client(ctx)
+            latencies = []
+            for i in range(options['requests']):
+                name = routes[i % len(routes)]
+                started = time.perf_counter()
+                try:
+                    response = bench.send(client, ctx, name)
+                    error = response.content.decode(errors='replace')[:200] if response.status_code >= 500 else None
+                except Exception as exc:
+                    error = str(exc)
+                latencies.append(time.perf_counter() - started)
+                if error:
+                    with lock:
+                        failures.append((kind, name, error))
+            connections.close_all()
+            with lock:
+                results[kind] += latencies
+
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=options['readers'] + options['writers']) as pool:
+                jobs = [pool.submit(worker, 'read', options['read_routes']) for _ in range(options['readers'])]
+                jobs += [pool.submit(worker, 'write', options['write_routes']) for _ in range(options['writers'])]
+                for job in jobs:
+                    job.result()
+            wall = time.perf_counter() - started
+        finally:
+            bench.cleanup(ctx)
+
+        report = {'meta': self.describe(options), 'wall_seconds': round(wall, 3)}
+        for kind, latencies in results.items():
+            report[kind] = self.summarize(sorted(latencies), [f for f in failures if f[0] == kind], wall)
+            self.stderr.write(
+                f'{kind}: p50 {report[kind]["p50_ms"]}ms p99 {report[kind]["p99_ms"]}ms '
+                f'{report[kind]["requests_per_second"]} req/s, {report[kind]["errors"]} errors '
+                f'({report[kind]["locked_errors"]} database is locked)')
+        report['sample_errors'] = sorted({error for _, _, error in failures})[:5]
+
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(payload + '\n')
+        else:
+            self.stdout.write(payload)
+
+    def summarize(self, latencies, failures, wall):
+        to_ms = lambda seconds: round(seconds * 1000, 3) if seconds is not None else None
+        return {
+            'requests': len(latencies),
+            'errors': len(failures),
+            'locked_errors': sum('database is locked' in error for _, _, error in failures),
+            'p50_ms': to_ms(percentile(latencies, 0.50)),
+            'p99_ms': to_ms(percentile(latencies, 0.99)),
+            'max_ms': to_ms(latencies[-1] if latencies else None),
+            'requests_per_second': round(len(latencies) / wall, 1) if wall else None,
+        }
+
+    def describe(self, options):
+        meta = {
+            'mode': getattr(settings, 'SNIPBOX_DB_MODE', 'development'),
+            'database': connection.vendor,
+            'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+            'replica': get_replica_alias(),
+            'readers': options['readers'],
+            'writers': options['writers'],
+            'requests_per_thread': options['requests'],
+        }
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                meta['journal_mode'] = cursor.execute('PRAGMA journal_mode').fetchone()[0]
+                meta['synchronous'] = cursor.execute('PRAGMA synchronous').fetchone()[0]
+            meta['transaction_mode'] = connection.transaction_mode
+        return meta
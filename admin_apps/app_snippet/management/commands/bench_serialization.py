@@ -0,0 +1,79 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from admin_apps.app_snippet.models import Snippet
+from admin_apps.app_snippet.renderers import FastJSONRenderer
+from admin_apps.app_snippet.serializers import *
+
+
+def serializer_links(queryset):
+    return SnippetSerializerListWithLinks(queryset.select_related('created_by'), many=True).data
+
+
+def fast_links(queryset):
+    return serialize_snippet_links(snippet_link_rows(queryset))
+
+
+def serializer_details(queryset):
+    return SnippetSerializerDetail(queryset.prefetch_related('tag'), many=True).data
+
+
+def fast_details(queryset):
+    rows = list(snippet_detail_rows(queryset))
+    return serialize_snippet_details(rows, group_tag_titles(tag_titles_queryset([row.id for row in rows])))
+
+
+# name -> (serializer path, fast path); each builds the list payload of one endpoint
+PAYLOADS = {
+    'overview': (serializer_links, fast_links),
+    'filter-tags': (serializer_details, fast_details),
+}
+
+
+class Command(BaseCommand):
+    help = ('Compare the serializer and values_list() fast paths of the list endpoints, and the stock '
+            'and fast JSON renderers, in rows per second over existing snippets.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Snippets per payload.')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement, the best one counts.')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        queryset = Snippet.objects.order_by('-created_at', '-id')[:options['rows']]
+        rows = queryset.count()
+        if not rows:
+            raise CommandError('No snippets to serialize, run seed_snippets first')
+
+        report = {'rows': rows, 'payloads': {}}
+        for name, (slow, fast) in PAYLOADS.items():
+            data = fast(queryset)
+            result = {
+                'serializer_rows_per_second': self.measure(lambda: slow(queryset), rows, options),
+                'fast_path_rows_per_second': self.measure(lambda: fast(queryset), rows, options),
+                'json_render_rows_per_second': self.measure(lambda: JSONRenderer().render(data), rows, options),
+                'fast_render_rows_per_second': self.measure(lambda: FastJSONRenderer().render(data), rows, options),
+            }
+            report['payloads'][name] = result
+            self.stderr.write(
+                f'{name}: serialize {result["serializer_rows_per_second"]} -> {result["fast_path_rows_per_second"]} '
+                f'rows/s, render {result["json_render_rows_per_second"]} -> {result["fast_render_rows_per_second"]} rows/s')
+
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(payload + '\n')
+        else:
+            self.stdout.write(payload)
+
+    def measure(self, func, rows, options):
+        best = None
+        for _ in range(max(1, options['repeat'])):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return round(rows / best, 1) if best else None
@@ -0,0 +1,223 @@
+import json
+import platform
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from admin_apps.app_snippet import urls as snippet_urls
+from admin_apps.app_snippet.models import Snippet
+from admin_apps.app_snippet.search import index_snippets
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class BenchContext:
+    """
+    Shared state of a benchmark run: the bench user, the snippets the write routes consume and
+    the users the sign-up route creates.
+    """
+    def __init__(self, user, snippet_id, deletable):
+        self.user = user
+        self.snippet_id = snippet_id
+        self.deletable = deletable
+        self.new_usernames = []
+        self.counter = 0
+        self.lock = threading.Lock()
+
+    def next(self):
+        with self.lock:
+            self.counter += 1
+            return self.counter
+
+    def new_username(self):
+        username = f'{self.user.username}-new-{time.time_ns()}-{self.next()}'
+        with self.lock:
+            self.new_usernames.append(username)
+        return username
+
+    def take_deletable(self):
+        with self.lock:
+            return self.deletable.pop() if self.deletable else self.snippet_id
+
+
+# url name -> (method, path builder, body builder); every route in app_snippet/urls.py
+ROUTES = {
+    'user-create-api': ('post', lambda ctx: reverse('user-create-api'),
+                        lambda ctx: {'username': ctx.new_username(), 'password': 'bench-pass-123'}),
+    'overview-api': ('get', lambda ctx: reverse('overview-api'), None),
+    'create-snippet-api': ('post', lambda ctx: reverse('create-snippet-api'),
+                           lambda ctx: {'title': 'bench', 'note': 'bench note', 'tag': ['bench', f'bench-{ctx.next() % 10}']}),
+    'list-tags-api': ('get', lambda ctx: reverse('list-tags-api'), None),
+    'tag-autocomplete-api': ('get', lambda ctx: reverse('tag-autocomplete-api') + '?q=seed-tag-1', None),
+    'bulk-import-snippet-api': ('ndjson', lambda ctx: reverse('bulk-import-snippet-api'),
+                                lambda ctx: '\n'.join(json.dumps({'title': f'bulk {i}', 'note': 'n', 'tag': ['bench']}) for i in range(10))),
+    'export-snippet-api': ('get', lambda ctx: reverse('export-snippet-api'), None),
+    'delete-snippet-api': ('post', lambda ctx: reverse('delete-snippet-api'),
+                           lambda ctx: {'snippet_id': ctx.take_deletable()}),
+    'snippet-details-api': ('get', lambda ctx: reverse('snippet-details-api', args=[ctx.snippet_id]), None),
+    'update-snippet-api': ('put', lambda ctx: reverse('update-snippet-api', args=[ctx.snippet_id]),
+                           lambda ctx: {'title': f'bench update {ctx.next()}'}),
+    'search-snippet-api': ('get', lambda ctx: reverse('search-snippet-api') + '?q=snippet', None),
+    'filter-tags-api': ('post', lambda ctx: reverse('filter-tags-api'), lambda ctx: {'query': 'bench OR seed-tag-1'}),
+    'sync-snippet-api': ('get', lambda ctx: reverse('sync-snippet-api'), None),
+    'cache-stats-api': ('get', lambda ctx: reverse('cache-stats-api'), None),
+    'perf-stats-api': ('get', lambda ctx: reverse('perf-stats-api'), None),
+    'async-overview-api': ('get', lambda ctx: reverse('async-overview-api'), None),
+    'async-list-tags-api': ('get', lambda ctx: reverse('async-list-tags-api'), None),
+    'async-snippet-details-api': ('get', lambda ctx: reverse('async-snippet-details-api', args=[ctx.snippet_id]), None),
+    'async-filter-tags-api': ('post', lambda ctx: reverse('async-filter-tags-api'), lambda ctx: {'query': 'bench OR seed-tag-1'}),
+}
+
+
+class Command(BaseCommand):
+    help = ('Drive every snippet API route through the Django test client at a given concurrency and '
+            'report latency percentiles, throughput and queries per request as JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per route.')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--routes', nargs='*', help='Only benchmark these url names.')
+        parser.add_argument('--username', default='bench',
+                            help='Staff user the requests run as, created for the run and deleted afterwards.')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        names = [pattern.name for pattern in snippet_urls.urlpatterns]
+        if options['routes']:
+            unknown = set(options['routes']) - set(names)
+            if unknown:
+                raise CommandError(f'Unknown routes: {", ".join(sorted(unknown))}')
+            names = options['routes']
+
+        ctx = self.prepare(options)
+        results = {}
+        try:
+            for name in names:
+                if name not in ROUTES:
+                    self.stderr.write(f'Skipping {name}: no benchmark request defined')
+                    continue
+                results[name] = self.run_route(ctx, name, options)
+                self.stderr.write(
+                    f'{name}: p50 {results[name]["p50_ms"]}ms p99 {results[name]["p99_ms"]}ms '
+                    f'{results[name]["requests_per_second"]} req/s {results[name]["queries_per_request"]} queries')
+        finally:
+            self.cleanup(ctx)
+
+        report = {'meta': self.describe(options), 'routes': results}
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(payload + '\n')
+        else:
+            self.stdout.write(payload)
+
+    def prepare(self, options):
+        """
+        Create the staff user the requests run as, and the snippets the read and delete routes
+        use. An existing user is never borrowed: it would be made staff and left with bench data.
+        """
+        if User.objects.filter(username=options['username']).exists():
+            raise CommandError(
+                f'User {options["username"]!r} already exists. The benchmark creates its own user and deletes '
+                f'it with everything it wrote afterwards, pass a --username that is not taken.')
+        user = User.objects.create_user(options['username'], is_staff=True)
+        snippet = Snippet.objects.create(title='bench snippet', note='bench note', created_by=user)
+        deletable = Snippet.objects.bulk_create(
+            Snippet(title='bench delete', note='n', created_by=user) for _ in range(options['requests'] + 1))
+        index_snippets([snippet, *deletable])
+        return BenchContext(user, snippet.id, [s.id for s in deletable])
+
+    def cleanup(self, ctx):
+        # Deleting the users cascades to every snippet the routes created, and unindexes them
+        User.objects.filter(username__in=[ctx.user.username, *ctx.new_usernames]).delete()
+
+    def make_client(self, ctx):
+        token = RefreshToken.for_user(ctx.user).access_token
+        host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'testserver'
+        return Client(HTTP_AUTHORIZATION=f'Bearer {token}', HTTP_HOST=host)
+
+    def send(self, client, ctx, name):
+        method, path, body = ROUTES[name]
+        if method == 'get':
+            return client.get(path(ctx))
+        if method == 'ndjson':
+            return client.post(path(ctx), body(ctx), content_type='application/x-ndjson')
+        return getattr(client, method)(path(ctx), body(ctx), content_type='application/json')
+
+    def run_route(self, ctx, name, options):
+        # Warm up, and count queries on a single request outside the timed run
+        client = self.make_client(ctx)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.send(client, ctx, name)
+            if getattr(response, 'streaming', False):
+                b''.join(response.streaming_content)
+        queries_per_request = len(queries)
+
+        local = threading.local()
+        errors = []
+
+        def one(_):
+            if not hasattr(local, 'client'):
+                local.client = self.make_client(ctx)
+            started = time.perf_counter()
+            response = self.send(local.client, ctx, name)
+            if getattr(response, 'streaming', False):
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+            if response.status_code >= 500:
+                errors.append(response.status_code)
+            return elapsed
+
+        started = time.perf_counter()
+        if options['concurrency'] > 1:
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                latencies = sorted(pool.map(one, range(options['requests'])))
+                # Each worker thread opened its own connection
+                list(pool.map(lambda _: connections.close_all(), range(options['concurrency'])))
+        else:
+            latencies = sorted(one(i) for i in range(options['requests']))
+        wall = time.perf_counter() - started
+
+        to_ms = lambda seconds: round(seconds * 1000, 3) if seconds is not None else None
+        return {
+            'requests': len(latencies),
+            'errors': len(errors),
+            'p50_ms': to_ms(percentile(latencies, 0.50)),
+            'p95_ms': to_ms(percentile(latencies, 0.95)),
+            'p99_ms': to_ms(percentile(latencies, 0.99)),
+            'mean_ms': to_ms(sum(latencies) / len(latencies)) if latencies else None,
+            'requests_per_second': round(len(latencies) / wall, 1) if wall else None,
+            'queries_per_request': queries_per_request,
+        }
+
+    def describe(self, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'timestamp': datetime.now(dt_timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'requests_per_route': options['requests'],
+            'concurrency': options['concurrency'],
+            'snippets': Snippet.objects.count(),
+        }
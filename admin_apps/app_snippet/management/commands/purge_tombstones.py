@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from admin_apps.app_snippet.sync import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Delete snippet tombstones older than SNIPPET_TOMBSTONE_RETENTION.'
+
+    def handle(self, *args, **options):
+        deleted = purge_tombstones()
+        self.stdout.write(self.style.SUCCESS(f'Purged {deleted} tombstones.'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from admin_apps.app_snippet.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the full-text search index from the snippet table, after writes that bypassed the '
+            'application (QuerySet.update(), other SQLite clients).')
+
+    def handle(self, *args, **options):
+        indexed = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} snippets.'))
@@ -0,0 +1,87 @@
+import random
+import string
+import time
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from admin_apps.app_snippet.models import Snippet, Tag
+from admin_apps.app_snippet.search import index_snippets
+
+
+class Command(BaseCommand):
+    help = 'Seed users and snippets with Zipf-distributed tags for load tests and benchmarks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--snippets', type=int, default=10000, help='Total snippets, spread over the users.')
+        parser.add_argument('--tags', type=int, default=1000, help='Size of the tag vocabulary.')
+        parser.add_argument('--tags-per-snippet', type=int, default=3)
+        parser.add_argument('--zipf', type=float, default=1.1, help='Zipf exponent of tag popularity.')
+        parser.add_argument('--note-size', type=int, default=500, help='Mean note length in characters.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='seed', help='Prefix of the generated usernames and tags.')
+        parser.add_argument('--password', default='seed-password')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for a reproducible dataset.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        users = self.create_users(options)
+        tag_ids = self.create_tags(options)
+        # Zipf: the tag of rank r is picked with weight 1 / r^s
+        cum_weights = list(accumulate(1 / rank ** options['zipf'] for rank in range(1, len(tag_ids) + 1)))
+        text = ''.join(rng.choices(string.ascii_lowercase + ' ' * 6 + '\n', k=max(options['note_size'] * 4, 4096)))
+
+        created, batch_size = 0, options['batch_size']
+        while created < options['snippets']:
+            count = min(batch_size, options['snippets'] - created)
+            self.create_batch(rng, users, tag_ids, cum_weights, text, count, created, options)
+            created += count
+            self.stdout.write(f'{created}/{options["snippets"]} snippets')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(users)} users, {len(tag_ids)} tags and {created} snippets '
+            f'in {elapsed:.1f}s ({created / elapsed if elapsed else 0:.0f} snippets/s).'))
+
+    def create_users(self, options):
+        password = make_password(options['password'])
+        usernames = [f'{options["prefix"]}-user-{i}' for i in range(options['users'])]
+        User.objects.bulk_create(
+            [User(username=username, password=password) for username in usernames], ignore_conflicts=True)
+        return list(User.objects.filter(username__in=usernames).values_list('id', flat=True))
+
+    def create_tags(self, options):
+        titles = [f'{options["prefix"]}-tag-{rank}' for rank in range(1, options['tags'] + 1)]
+        Tag.objects.bulk_create([Tag(title=title) for title in titles], ignore_conflicts=True)
+        ids = dict(Tag.objects.filter(title__in=titles).values_list('title', 'id'))
+        return [ids[title] for title in titles]
+
+    def create_batch(self, rng, users, tag_ids, cum_weights, text, count, offset, options):
+        note_size = options['note_size']
+        with transaction.atomic():
+            snippets = Snippet.objects.bulk_create([
+                Snippet(
+                    title=f'{options["prefix"]} snippet {offset + i}',
+                    note=self.make_note(rng, text, note_size),
+                    created_by_id=rng.choice(users),
+                )
+                for i in range(count)
+            ])
+            index_snippets(snippets)
+            Through = Snippet.tag.through
+            Through.objects.bulk_create([
+                Through(snippet_id=snippet.id, tag_id=tag_id)
+                for snippet in snippets
+                for tag_id in set(rng.choices(tag_ids, cum_weights=cum_weights, k=options['tags_per_snippet']))
+            ])
+
+    def make_note(self, rng, text, note_size):
+        length = max(1, int(rng.expovariate(1 / note_size))) if note_size else 1
+        length = min(length, len(text))
+        start = rng.randrange(len(text) - length + 1)
+        return text[start:start + length]
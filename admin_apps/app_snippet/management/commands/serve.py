@@ -0,0 +1,109 @@
+import os
+import time
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import get_internal_wsgi_application
+from gunicorn.app.base import BaseApplication
+
+from admin_apps.app_snippet.cache import get_response_cache
+from admin_apps.app_snippet.warmup import warm_up
+
+
+def process_age():
+    """
+    Return the seconds since this process started, or None where /proc does not say.
+    """
+    try:
+        with open('/proc/uptime') as handle:
+            uptime = float(handle.read().split()[0])
+        with open('/proc/self/stat') as handle:
+            # starttime, the 22nd field, in clock ticks since boot; the command name may hold spaces
+            started = int(handle.read().rpartition(')')[2].split()[19])
+    except (OSError, ValueError, IndexError):
+        return None
+    return uptime - started / os.sysconf('SC_CLK_TCK')
+
+
+def pre_request(worker, req):
+    # Only the first request of a worker is timed; setdefault() is atomic across its threads
+    worker.__dict__.setdefault('snipbox_first_request', (req, time.perf_counter()))
+
+
+def post_request(worker, req, environ, resp):
+    first, started = worker.__dict__.get('snipbox_first_request', (None, None))
+    if first is req:
+        worker.snipbox_first_request = (None, None)
+        worker.log.info('Worker %s: first request %s took %.1f ms',
+                        worker.pid, req.path, (time.perf_counter() - started) * 1000)
+
+
+class SnipBoxServer(BaseApplication):
+    """
+    gunicorn configured from the serve options. The project WSGI application is preloaded and
+    warmed up in the master, so every worker forks from a ready process.
+    """
+    def __init__(self, options):
+        self.options = options
+        self.load_ms = None
+        super().__init__()
+
+    def load_config(self):
+        config = {
+            'bind': self.options['bind'],
+            'workers': self.options['workers'],
+            'worker_class': 'gthread',
+            'threads': self.options['threads'],
+            'timeout': self.options['timeout'],
+            'graceful_timeout': self.options['timeout'],
+            'keepalive': self.options['keepalive'],
+            'preload_app': True,
+            'accesslog': '-',
+            'when_ready': self.when_ready,
+            'pre_request': pre_request,
+            'post_request': post_request,
+        }
+        for name, value in config.items():
+            self.cfg.set(name, value)
+
+    def load(self):
+        started = time.perf_counter()
+        application = get_internal_wsgi_application()
+        self.load_ms = (time.perf_counter() - started) * 1000
+        return application
+
+    def when_ready(self, server):
+        # Called in the master once the socket is bound and before any worker is forked;
+        # warm_up() closes its database connections so the workers do not share them
+        timings = warm_up(self.wsgi()) if self.options['warmup'] else {}
+        server.log.info('Loaded the application in %.1f ms, warmed up in %.1f ms %s',
+                        self.load_ms or 0, sum(timings.values()), timings)
+        age = process_age()
+        if age is not None:
+            server.log.info('Cold start: ready %.0f ms after the process started', age * 1000)
+
+
+class Command(BaseCommand):
+    help = ('Serve the project WSGI application with gunicorn: preforked workers with a pool of request '
+            'threads each, forked after the application is loaded and warmed up once in the master.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bind', default='0.0.0.0:8000', help='host:port to listen on.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--threads', type=int, default=8, help='Request threads per worker.')
+        parser.add_argument('--timeout', type=int, default=30,
+                            help='Seconds a worker may go silent, e.g. on a stuck request, before it is restarted.')
+        parser.add_argument('--keepalive', type=int, default=5,
+                            help='Seconds an idle keep-alive connection is held open.')
+        parser.add_argument('--no-warmup', action='store_false', dest='warmup',
+                            help='Fork straight after loading the application.')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['threads'] < 1:
+            raise CommandError('--workers and --threads must be at least 1')
+        if options['workers'] > 1 and isinstance(get_response_cache(), LocMemCache):
+            raise CommandError(
+                'The response cache is process-local (LocMemCache), so workers would serve each other\'s '
+                'stale responses. Use --workers 1, or a shared cache such as the file-based one '
+                'SNIPBOX_DB_MODE=production configures.')
+        SnipBoxServer(options).run()
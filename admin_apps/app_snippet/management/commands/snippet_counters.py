@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from admin_apps.app_snippet.counters import rebuild_counters, verify_counters
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-user and total snippet counters from the snippet table, then verify them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only verify the counters, fail on any drift.')
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            rebuilt = rebuild_counters()
+            self.stdout.write(f'Rebuilt {rebuilt} counters.')
+        mismatches = verify_counters()
+        for user_id, stored, actual in mismatches:
+            self.stderr.write(f'user {user_id}: counter {stored}, snippets {actual}')
+        if mismatches:
+            raise CommandError(f'{len(mismatches)} snippet counters are out of date')
+        self.stdout.write(self.style.SUCCESS('Snippet counters are up to date.'))
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+# Contentless FTS5 index over Snippet.title/note, plus an owner column holding 'u<user id>'
+# so a search matches 'owner:u<id> AND (...)' within one user's snippets. No trigger feeds
+# it: notes are stored compressed (migration 0006) and only Python can decode them, so the
+# application indexes what it writes, see search.py.
+CREATE_SQL = [
+    "CREATE VIRTUAL TABLE app_snippet_snippet_fts USING fts5(title, note, owner, content='')",
+    """
+    INSERT INTO app_snippet_snippet_fts(rowid, title, note, owner)
+    SELECT id, title, note, 'u' || created_by_id FROM app_snippet_snippet
+    """,
+]
+
+DROP_SQL = [
+    "DROP TABLE IF EXISTS app_snippet_snippet_fts",
+]
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_snippet', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_sqlite(CREATE_SQL), run_on_sqlite(DROP_SQL)),
+    ]
@@ -0,0 +1,51 @@
+from django.db import migrations, models
+
+# Keep Tag.snippet_count in step with the through table, whichever code path
+# (m2m set, bulk_create, cascade delete) adds or removes the link.
+CREATE_SQL = [
+    """
+    CREATE TRIGGER app_snippet_snippet_tag_count_ai AFTER INSERT ON app_snippet_snippet_tag BEGIN
+        UPDATE app_snippet_tag SET snippet_count = snippet_count + 1 WHERE id = new.tag_id;
+    END
+    """,
+    """
+    CREATE TRIGGER app_snippet_snippet_tag_count_ad AFTER DELETE ON app_snippet_snippet_tag BEGIN
+        UPDATE app_snippet_tag SET snippet_count = snippet_count - 1 WHERE id = old.tag_id;
+    END
+    """,
+    """
+    UPDATE app_snippet_tag SET snippet_count = (
+        SELECT COUNT(*) FROM app_snippet_snippet_tag WHERE tag_id = app_snippet_tag.id
+    )
+    """,
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS app_snippet_snippet_tag_count_ad",
+    "DROP TRIGGER IF EXISTS app_snippet_snippet_tag_count_ai",
+]
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_snippet', '0002_snippet_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='snippet_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(run_on_sqlite(CREATE_SQL), run_on_sqlite(DROP_SQL)),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 5.1.4 on 2026-10-18 20:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Record a tombstone for every deleted snippet, whether it goes through DeleteSnippetAPI,
+# a queryset delete or a cascade. The timestamp format matches how Django stores datetimes.
+#
+# Number every insert and update of a snippet from one sequence, under the write lock, so the
+# sync feed can resume from a number: updated_at is taken before the write and does not follow
+# commit order, and QuerySet.update() leaves it alone. Existing rows are numbered in
+# (updated_at, id) order. A migration that rebuilds the snippet table must create these again.
+CREATE_SQL = [
+    """
+    CREATE TRIGGER app_snippet_snippet_tombstone_ad AFTER DELETE ON app_snippet_snippet BEGIN
+        INSERT INTO app_snippet_snippettombstone(snippet_id, created_by_id, deleted_at)
+        VALUES (old.id, old.created_by_id, strftime('%Y-%m-%d %H:%M:%f', 'now'));
+    END
+    """,
+    """
+    UPDATE app_snippet_snippet SET change_seq = ordered.seq
+    FROM (SELECT id, ROW_NUMBER() OVER (ORDER BY updated_at, id) AS seq FROM app_snippet_snippet) AS ordered
+    WHERE ordered.id = app_snippet_snippet.id
+    """,
+    """
+    INSERT INTO app_snippet_snippetchangesequence(id, last_value)
+    SELECT 1, COALESCE(MAX(change_seq), 0) FROM app_snippet_snippet
+    """,
+    """
+    CREATE TRIGGER app_snippet_snippet_change_seq_ai AFTER INSERT ON app_snippet_snippet BEGIN
+        UPDATE app_snippet_snippetchangesequence SET last_value = last_value + 1 WHERE id = 1;
+        UPDATE app_snippet_snippet
+        SET change_seq = (SELECT last_value FROM app_snippet_snippetchangesequence WHERE id = 1)
+        WHERE id = new.id;
+    END
+    """,
+    # Every column but change_seq, so the trigger's own update does not fire it again
+    """
+    CREATE TRIGGER app_snippet_snippet_change_seq_au
+    AFTER UPDATE OF title, note, created_at, updated_at, created_by_id ON app_snippet_snippet BEGIN
+        UPDATE app_snippet_snippetchangesequence SET last_value = last_value + 1 WHERE id = 1;
+        UPDATE app_snippet_snippet
+        SET change_seq = (SELECT last_value FROM app_snippet_snippetchangesequence WHERE id = 1)
+        WHERE id = new.id;
+    END
+    """,
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS app_snippet_snippet_change_seq_au",
+    "DROP TRIGGER IF EXISTS app_snippet_snippet_change_seq_ai",
+    "DELETE FROM app_snippet_snippetchangesequence",
+    "DROP TRIGGER IF EXISTS app_snippet_snippet_tombstone_ad",
+]
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_snippet', '0003_tag_snippet_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnippetTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('snippet_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(db_index=True)),
+                ('created_by', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_by', 'id'], name='app_snippet_created_70b90b_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SnippetChangeSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='snippet',
+            name='change_seq',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(run_on_sqlite(CREATE_SQL), run_on_sqlite(DROP_SQL)),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.4 on 2026-10-18 20:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_snippet', '0004_snippettombstone'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='snippet',
+            index=models.Index(fields=['created_at', 'id'], name='app_snippet_created_bf5c11_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='snippet',
+            index=models.Index(fields=['created_by', 'created_at', 'id'], name='app_snippet_created_41ad51_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='snippet',
+            index=models.Index(fields=['created_by', 'change_seq'], name='app_snippet_created_afafa0_idx'),
+        ),
+        # Tag filters look up snippet ids by tag; the auto-created through table only has
+        # (snippet_id, tag_id) unique and a tag_id index that does not cover snippet_id.
+        migrations.RunSQL(
+            'CREATE INDEX app_snippet_snippet_tag_tag_snippet_idx ON app_snippet_snippet_tag (tag_id, snippet_id)',
+            'DROP INDEX app_snippet_snippet_tag_tag_snippet_idx',
+        ),
+    ]
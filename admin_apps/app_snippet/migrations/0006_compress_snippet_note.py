@@ -0,0 +1,92 @@
+# Generated by Django 5.1.4 on 2026-10-18 20:33
+
+import admin_apps.app_snippet.fields
+from django.db import migrations
+
+# Altering the column makes SQLite rebuild the snippet table, which drops its triggers, so
+# they are dropped up front (nothing fires while the notes are rewritten) and created again
+# afterwards, as migration 0004 created them.
+DROP_TRIGGERS_SQL = [
+    "DROP TRIGGER IF EXISTS app_snippet_snippet_change_seq_au",
+    "DROP TRIGGER IF EXISTS app_snippet_snippet_change_seq_ai",
+    "DROP TRIGGER IF EXISTS app_snippet_snippet_tombstone_ad",
+]
+
+CREATE_TRIGGERS_SQL = [
+    """
+    CREATE TRIGGER app_snippet_snippet_tombstone_ad AFTER DELETE ON app_snippet_snippet BEGIN
+        INSERT INTO app_snippet_snippettombstone(snippet_id, created_by_id, deleted_at)
+        VALUES (old.id, old.created_by_id, strftime('%Y-%m-%d %H:%M:%f', 'now'));
+    END
+    """,
+    """
+    CREATE TRIGGER app_snippet_snippet_change_seq_ai AFTER INSERT ON app_snippet_snippet BEGIN
+        UPDATE app_snippet_snippetchangesequence SET last_value = last_value + 1 WHERE id = 1;
+        UPDATE app_snippet_snippet
+        SET change_seq = (SELECT last_value FROM app_snippet_snippetchangesequence WHERE id = 1)
+        WHERE id = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER app_snippet_snippet_change_seq_au
+    AFTER UPDATE OF title, note, created_at, updated_at, created_by_id ON app_snippet_snippet BEGIN
+        UPDATE app_snippet_snippetchangesequence SET last_value = last_value + 1 WHERE id = 1;
+        UPDATE app_snippet_snippet
+        SET change_seq = (SELECT last_value FROM app_snippet_snippetchangesequence WHERE id = 1)
+        WHERE id = new.id;
+    END
+    """,
+]
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+def compress_notes(apps, schema_editor):
+    # SQLite kept the text values through the table rebuild; other databases cast the
+    # text column to bytes, which are the UTF-8 text without the storage prefix.
+    Snippet = apps.get_model('app_snippet', 'Snippet')
+    batch = []
+    for snippet_id, note in Snippet.objects.values_list('id', 'note').iterator(chunk_size=1000):
+        text = note if isinstance(note, str) else bytes(note).decode()
+        batch.append(Snippet(id=snippet_id, note=text))
+        if len(batch) == 1000:
+            Snippet.objects.bulk_update(batch, ['note'])
+            batch = []
+    if batch:
+        Snippet.objects.bulk_update(batch, ['note'])
+
+
+def decompress_notes(apps, schema_editor):
+    Snippet = apps.get_model('app_snippet', 'Snippet')
+    table = schema_editor.quote_name(Snippet._meta.db_table)
+    rows = Snippet.objects.values_list('id', 'note').iterator(chunk_size=1000)
+    with schema_editor.connection.cursor() as cursor:
+        for snippet_id, note in rows:
+            cursor.execute(
+                f'UPDATE {table} SET note = %s WHERE id = %s',
+                [admin_apps.app_snippet.fields.decompress_note(note), snippet_id])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_snippet', '0005_snippet_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_sqlite(DROP_TRIGGERS_SQL), run_on_sqlite(CREATE_TRIGGERS_SQL)),
+        migrations.AlterField(
+            model_name='snippet',
+            name='note',
+            field=admin_apps.app_snippet.fields.CompressedTextField(),
+        ),
+        migrations.RunPython(compress_notes, decompress_notes),
+        migrations.RunPython(run_on_sqlite(CREATE_TRIGGERS_SQL), run_on_sqlite(DROP_TRIGGERS_SQL)),
+    ]
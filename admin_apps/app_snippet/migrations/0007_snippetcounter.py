@@ -0,0 +1,75 @@
+# Generated by Django 5.1.4 on 2026-10-18 20:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Keep SnippetCounter in step with the snippet table, whichever code path (serializer,
+# bulk_create, queryset or cascade delete) writes it, in the same transaction. User 0
+# holds the total. A migration that rebuilds the snippet table must create these again.
+CREATE_SQL = [
+    """
+    CREATE TRIGGER app_snippet_snippet_counter_ai AFTER INSERT ON app_snippet_snippet BEGIN
+        INSERT INTO app_snippet_snippetcounter(user_id, snippet_count)
+        VALUES (new.created_by_id, 1), (0, 1)
+        ON CONFLICT(user_id) DO UPDATE SET snippet_count = snippet_count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER app_snippet_snippet_counter_ad AFTER DELETE ON app_snippet_snippet BEGIN
+        UPDATE app_snippet_snippetcounter SET snippet_count = snippet_count - 1
+        WHERE user_id IN (old.created_by_id, 0);
+    END
+    """,
+    """
+    CREATE TRIGGER app_snippet_snippet_counter_au AFTER UPDATE OF created_by_id ON app_snippet_snippet
+    WHEN old.created_by_id IS NOT new.created_by_id BEGIN
+        UPDATE app_snippet_snippetcounter SET snippet_count = snippet_count - 1
+        WHERE user_id = old.created_by_id;
+        INSERT INTO app_snippet_snippetcounter(user_id, snippet_count) VALUES (new.created_by_id, 1)
+        ON CONFLICT(user_id) DO UPDATE SET snippet_count = snippet_count + 1;
+    END
+    """,
+    """
+    INSERT INTO app_snippet_snippetcounter(user_id, snippet_count)
+    SELECT created_by_id, COUNT(*) FROM app_snippet_snippet GROUP BY created_by_id
+    """,
+    "INSERT INTO app_snippet_snippetcounter(user_id, snippet_count) SELECT 0, COUNT(*) FROM app_snippet_snippet",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS app_snippet_snippet_counter_au",
+    "DROP TRIGGER IF EXISTS app_snippet_snippet_counter_ad",
+    "DROP TRIGGER IF EXISTS app_snippet_snippet_counter_ai",
+]
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_snippet', '0006_compress_snippet_note'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnippetCounter',
+            fields=[
+                ('user_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('snippet_count', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='snippet',
+            index=models.Index(fields=['updated_at'], name='app_snippet_updated_b3134e_idx'),
+        ),
+        migrations.RunPython(run_on_sqlite(CREATE_SQL), run_on_sqlite(DROP_SQL)),
+    ]
@@ -1,10 +1,14 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from .fields import CompressedTextField
+
 # Create your models here.
 
 class Tag(models.Model):
     title = models.CharField(max_length=100, unique=True)
+    # Maintained by database triggers on the snippet/tag through table, see migration 0003
+    snippet_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.title
@@ -15,14 +19,59 @@ class Tag(models.Model):
 
 class Snippet(models.Model):
     title = models.CharField(max_length=255)
-    note = models.TextField()
+    # Large notes are stored zlib compressed, see fields.py and migration 0006
+    note = CompressedTextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='snippets')
     tag = models.ManyToManyField(Tag, related_name='snippets', blank=True)
+    # Set by database triggers on every insert and update from SnippetChangeSequence, so it
+    # follows commit order, unlike updated_at. Orders the sync feed, see migration 0004.
+    change_seq = models.BigIntegerField(null=True, editable=False)
 
     def __str__(self):
         return self.title
 
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        # Keyset pages of the overview, a user's snippets newest first (filter-tags, delete by
+        # date) and the sync feed, see the query plan tests
+        indexes = [
+            models.Index(fields=['updated_at']),
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['created_by', 'created_at', 'id']),
+            models.Index(fields=['created_by', 'change_seq']),
+        ]
+
+class SnippetTombstone(models.Model):
+    # Written by a delete trigger on the snippet table, see migration 0004. No FK to Snippet
+    # (the row is gone) nor a constraint on User, so deleting a user cascades cleanly.
+    snippet_id = models.BigIntegerField()
+    created_by = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    deleted_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return str(self.snippet_id)
+
+    class Meta:
+        indexes = [models.Index(fields=['created_by', 'id'])]
+
+class SnippetChangeSequence(models.Model):
+    # A single row, the last Snippet.change_seq handed out by the triggers of migration 0004.
+    # Deleted snippets never give their number back.
+    last_value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return str(self.last_value)
+
+class SnippetCounter(models.Model):
+    # Maintained by triggers on the snippet table, see migration 0007: the number of snippets
+    # of each user, keyed by user id, and of all users under ALL_USERS.
+    ALL_USERS = 0
+
+    user_id = models.BigIntegerField(primary_key=True)
+    snippet_count = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.user_id}: {self.snippet_count}'
@@ -0,0 +1,122 @@
+# pagination.py
+import base64
+import binascii
+import json
+from collections import namedtuple
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 50
+DEFAULT_MAX_PAGE_SIZE = 500
+
+Page = namedtuple('Page', ['items', 'next_cursor', 'previous_cursor'])
+
+
+class InvalidCursor(ValueError):
+    """
+    Raised when a client sends a cursor that cannot be decoded.
+    """
+
+
+def dump_cursor(payload):
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def load_cursor(value):
+    """
+    Return the payload dict of an opaque cursor, raising InvalidCursor when it is malformed.
+    """
+    try:
+        padded = value + '=' * (-len(value) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, TypeError, AttributeError):
+        raise InvalidCursor(value)
+    if not isinstance(payload, dict):
+        raise InvalidCursor(value)
+    return payload
+
+
+def encode_cursor(snippet, reverse=False):
+    payload = {'c': snippet.created_at.isoformat(), 'i': snippet.id}
+    if reverse:
+        payload['r'] = 1
+    return dump_cursor(payload)
+
+
+def decode_cursor(value):
+    """
+    Return (created_at, id, reverse) for an opaque cursor, or None when no cursor was sent.
+    """
+    if not value:
+        return None
+    payload = load_cursor(value)
+    try:
+        created_at = parse_datetime(payload['c'])
+        snippet_id = int(payload['i'])
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor(value)
+    if created_at is None:
+        raise InvalidCursor(value)
+    return created_at, snippet_id, bool(payload.get('r'))
+
+
+def get_page_size(params):
+    default = getattr(settings, 'SNIPPET_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    maximum = getattr(settings, 'SNIPPET_MAX_PAGE_SIZE', DEFAULT_MAX_PAGE_SIZE)
+    try:
+        page_size = int(params.get('page_size', default))
+    except (TypeError, ValueError):
+        page_size = default
+    return max(1, min(page_size, maximum))
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination keyed on (created_at, id), newest first, matching Snippet.Meta.ordering.
+    Every page is a single indexed range query, so the cost does not grow with the table.
+    """
+    def __init__(self, params):
+        self.page_size = get_page_size(params)
+        self.cursor = decode_cursor(params.get('cursor'))
+
+    @property
+    def reverse(self):
+        return bool(self.cursor and self.cursor[2])
+
+    def get_page_queryset(self, queryset):
+        """
+        Return the lazily evaluated slice for the requested page, one row longer than the page
+        so that build_page() can tell whether another page follows.
+        """
+        if self.cursor:
+            created_at, snippet_id, reverse = self.cursor
+            if reverse:
+                queryset = queryset.filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=snippet_id))
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=snippet_id))
+        if self.reverse:
+            queryset = queryset.order_by('created_at', 'id')
+        else:
+            queryset = queryset.order_by('-created_at', '-id')
+        return queryset[:self.page_size + 1]
+
+    def build_page(self, rows):
+        rows = list(rows)
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+            has_next, has_previous = bool(rows), has_more
+        else:
+            has_next, has_previous = has_more, self.cursor is not None
+        next_cursor = encode_cursor(rows[-1]) if rows and has_next else None
+        previous_cursor = encode_cursor(rows[0], reverse=True) if rows and has_previous else None
+        return Page(rows, next_cursor, previous_cursor)
+
+    def paginate(self, queryset):
+        return self.build_page(self.get_page_queryset(queryset))
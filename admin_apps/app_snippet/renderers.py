@@ -0,0 +1,65 @@
+# renderers.py
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from .instrumentation import TimedRendererMixin
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class StreamingRenderer(BaseRenderer):
+    """
+    Selects a streaming export format during content negotiation. Views stream the
+    body themselves, so only error responses (auth failures etc.) are rendered here.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data).encode(self.charset)
+
+
+class NDJSONRenderer(StreamingRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class CSVRenderer(StreamingRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes through orjson when it is installed, for the list views. Dates,
+    decimals and other types orjson does not share DRF's format for go through DRF's encoder,
+    and whatever orjson refuses (integers beyond 64 bits) through JSONRenderer itself, as does
+    indented, spaced and ASCII-only output. Floats are not the same: orjson writes 1e16 where
+    json writes 1e+16, and NaN as null where strict JSONRenderer raises, so it is only set on
+    views whose responses hold no floats.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {})):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped by JSONRenderer too, they are line terminators in JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class TimedJSONRenderer(TimedRendererMixin, JSONRenderer):
+    pass
+
+
+class TimedFastJSONRenderer(TimedRendererMixin, FastJSONRenderer):
+    pass
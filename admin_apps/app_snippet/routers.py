@@ -0,0 +1,70 @@
+# routers.py
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+DEFAULT_REPLICA_DATABASE = 'replica'
+
+# True while a read-only view runs, see ReplicaReadMixin
+replica_reads_enabled = ContextVar('snipbox_replica_reads', default=False)
+
+
+def get_replica_alias():
+    """
+    Return the alias of the replica database, or None when none is configured.
+    """
+    alias = getattr(settings, 'SNIPPET_REPLICA_DATABASE', DEFAULT_REPLICA_DATABASE)
+    return alias if alias in connections else None
+
+
+def get_serving_aliases():
+    """
+    Return the aliases requests use: default and, when configured, the replica.
+    """
+    replica = get_replica_alias()
+    return [DEFAULT_DB_ALIAS] + ([replica] if replica and replica != DEFAULT_DB_ALIAS else [])
+
+
+@contextmanager
+def replica_reads():
+    token = replica_reads_enabled.set(True)
+    try:
+        yield
+    finally:
+        replica_reads_enabled.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Sends the reads of read-only views to SNIPPET_REPLICA_DATABASE, when it is configured.
+    Everything else, including reads that must see a write of the same request, stays on
+    default.
+    """
+    def db_for_read(self, model, **hints):
+        if replica_reads_enabled.get():
+            return get_replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == get_replica_alias():
+            return False
+        return None
+
+
+class ReplicaReadMixin:
+    """
+    For views that never write: authentication, permission checks and the handler all read
+    from the replica.
+    """
+    def dispatch(self, request, *args, **kwargs):
+        with replica_reads():
+            return super().dispatch(request, *args, **kwargs)
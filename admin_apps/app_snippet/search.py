@@ -0,0 +1,163 @@
+# search.py
+from collections import namedtuple
+
+from django.db import connection, connections, router, transaction
+
+from .fields import decompress_note
+from .models import Snippet
+from .pagination import InvalidCursor, KeysetPaginator, dump_cursor, get_page_size, load_cursor
+
+SearchPage = namedtuple('SearchPage', ['items', 'next_cursor'])
+
+DEFAULT_INDEX_CHUNK_SIZE = 1000
+
+# The index is contentless (see migration 0002): it holds no copy of the text and no trigger
+# feeds it, since notes are stored compressed and only Python can decode them. The code that
+# writes snippets keeps it in sync: the serializers on create and update, index_snippets()
+# after bulk_create(), unindex_snippets() before a delete, in one statement per call rather
+# than per row. Writes that bypass these (QuerySet.update(), other SQLite clients) leave it
+# stale until rebuild_search_index(). Removing a row needs the text it was indexed with.
+# The owner column holds 'u<user id>' (migration 0002), so MATCH itself is scoped to a user.
+INDEX_SQL = "INSERT INTO app_snippet_snippet_fts(rowid, title, note, owner) VALUES (%s, %s, %s, 'u' || %s)"
+UNINDEX_SQL = """
+    INSERT INTO app_snippet_snippet_fts(app_snippet_snippet_fts, rowid, title, note, owner)
+    VALUES ('delete', %s, %s, %s, 'u' || %s)
+"""
+
+# bm25() is lower for better matches, the owner column weighs nothing in it; rows are
+# ordered by (rank, id) so the cursor can resume right after the last row of the previous
+# page. The created_by check only guards against an index left stale by outside writes.
+SEARCH_SQL = """
+    SELECT id, rank FROM (
+        SELECT s.id AS id, bm25(app_snippet_snippet_fts, 1.0, 1.0, 0.0) AS rank
+        FROM app_snippet_snippet_fts
+        JOIN app_snippet_snippet s ON s.id = app_snippet_snippet_fts.rowid
+        WHERE app_snippet_snippet_fts MATCH %s AND s.created_by_id = %s
+    )
+    WHERE rank > %s OR (rank = %s AND id > %s)
+    ORDER BY rank, id
+    LIMIT %s
+"""
+
+
+def get_index_connection(using):
+    conn = connections[using or router.db_for_write(Snippet)]
+    return conn if conn.vendor == 'sqlite' else None
+
+
+def index_rows(rows, using=None, sql=INDEX_SQL):
+    """
+    Add (id, title, note text, owner id) rows to the full-text index, or remove them with
+    UNINDEX_SQL.
+    """
+    conn = get_index_connection(using)
+    rows = list(rows)
+    if conn is not None and rows:
+        with conn.cursor() as cursor:
+            cursor.executemany(sql, rows)
+
+
+def snippet_index_row(snippet):
+    return (snippet.id, snippet.title, snippet.note, snippet.created_by_id)
+
+
+def index_snippets(snippets, using=None):
+    index_rows(map(snippet_index_row, snippets), using)
+
+
+def reindex_snippet(previous, snippet, using=None):
+    """
+    Replace `previous`, the snippet_index_row() of `snippet` before it changed, in the index.
+    """
+    row = snippet_index_row(snippet)
+    if row != previous:
+        index_rows([previous], using, UNINDEX_SQL)
+        index_rows([row], using)
+
+
+def unindex_snippets(queryset, using=None):
+    """
+    Remove the snippets of `queryset` from the index, reading them in one query, and return
+    their ids. Call it in the transaction that deletes them, then delete exactly those ids.
+    """
+    rows = [(snippet_id, title, decompress_note(note), owner_id)
+            for snippet_id, title, note, owner_id in queryset.values_list('id', 'title', 'note', 'created_by')]
+    index_rows(rows, using, UNINDEX_SQL)
+    return [row[0] for row in rows]
+
+
+def rebuild_search_index(using=None):
+    """
+    Re-index every snippet from the snippet table and return how many were indexed.
+    """
+    conn = get_index_connection(using)
+    if conn is None:
+        return 0
+    indexed, batch = 0, []
+    with transaction.atomic(using=conn.alias):
+        with conn.cursor() as cursor:
+            cursor.execute("INSERT INTO app_snippet_snippet_fts(app_snippet_snippet_fts) VALUES ('delete-all')")
+        rows = Snippet.objects.using(conn.alias).values_list('id', 'title', 'note', 'created_by').order_by('id')
+        for snippet_id, title, note, owner_id in rows.iterator(chunk_size=DEFAULT_INDEX_CHUNK_SIZE):
+            batch.append((snippet_id, title, decompress_note(note), owner_id))
+            if len(batch) == DEFAULT_INDEX_CHUNK_SIZE:
+                index_rows(batch, conn.alias)
+                indexed, batch = indexed + len(batch), []
+        index_rows(batch, conn.alias)
+    return indexed + len(batch)
+
+
+def build_match_expression(query, user_id):
+    """
+    Quote every term so user input is matched literally (all terms required) instead of
+    being parsed as FTS5 query syntax, within the snippets of `user_id`.
+    """
+    terms = ' '.join('"%s"' % term.replace('"', '""') for term in query.split())
+    return f'owner:u{int(user_id)} AND ({terms})'
+
+
+def decode_search_cursor(value):
+    if not value:
+        return float('-inf'), 0
+    payload = load_cursor(value)
+    try:
+        return float(payload['r']), int(payload['i'])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidCursor(value)
+
+
+def search_snippets(user, query, params, queryset=None):
+    """
+    Return a page of the user's snippets matching `query`, best match first. The snippets
+    are loaded from `queryset`, by default every snippet with its tags prefetched.
+    """
+    if queryset is None:
+        queryset = Snippet.objects.prefetch_related('tag')
+    if connection.vendor != 'sqlite':
+        return search_snippets_fallback(user, query, params, queryset)
+
+    page_size = get_page_size(params)
+    rank, last_id = decode_search_cursor(params.get('cursor'))
+    with connection.cursor() as cursor:
+        cursor.execute(SEARCH_SQL, [
+            build_match_expression(query, user.pk), user.pk, rank, rank, last_id, page_size + 1])
+        hits = cursor.fetchall()
+
+    has_more = len(hits) > page_size
+    hits = hits[:page_size]
+    snippets = queryset.in_bulk([snippet_id for snippet_id, _ in hits])
+    items = [snippets[snippet_id] for snippet_id, _ in hits if snippet_id in snippets]
+    next_cursor = dump_cursor({'r': hits[-1][1], 'i': hits[-1][0]}) if has_more else None
+    return SearchPage(items, next_cursor)
+
+
+def search_snippets_fallback(user, query, params, queryset):
+    """
+    Unranked substring search, newest first, for databases without FTS5. Notes are stored
+    as (possibly compressed) bytes, so only titles are matched.
+    """
+    queryset = queryset.filter(created_by=user)
+    for term in query.split():
+        queryset = queryset.filter(title__icontains=term)
+    page = KeysetPaginator(params).paginate(queryset)
+    return SearchPage(page.items, page.next_cursor)
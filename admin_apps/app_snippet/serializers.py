@@ -1,8 +1,26 @@
 # serializers.py
+from collections import defaultdict
+from operator import attrgetter
+
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.conf import settings
+from django.db import transaction
 from .models import *
+from .fields import preview_note
+from .search import index_snippets, reindex_snippet, snippet_index_row
+from .tags import resolve_tag_ids
+from .instrumentation import TimedSerializerMixin, timed
+
+class DynamicFieldsMixin:
+    """
+    Takes an optional `fields` argument naming the subset of Meta.fields to output.
+    """
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
 # User serializer
 class UserSerializer(serializers.ModelSerializer):
@@ -21,13 +39,13 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 # Tag serializer
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(DynamicFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
-        fields = ['title',]
+        fields = ['title', 'snippet_count']
 
 # Snippet list serializer with links
-class SnippetSerializerListWithLinks(serializers.ModelSerializer):
+class SnippetSerializerListWithLinks(TimedSerializerMixin, serializers.ModelSerializer):
     detail_url = serializers.SerializerMethodField()
     created_by = serializers.SerializerMethodField()
 
@@ -42,64 +60,41 @@ class SnippetSerializerListWithLinks(serializers.ModelSerializer):
         fields = ['id', 'title','detail_url','created_by']
 
 # Snippet list serializer
-class SnippetSerializer(serializers.ModelSerializer):
+class SnippetSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     tag = serializers.ListField(child=serializers.CharField(max_length=100))
     class Meta:
         model = Snippet
         fields = ['id', 'title', 'note', 'created_at', 'updated_at', 'tag']
 
     def list(self, validated_data):
-        tags_data = validated_data.pop('tag', [])
-        snippet = Snippet.objects.create(**validated_data)
-
-        tag_objects = []
-        for tag_data in tags_data:
-            tag = Tag.objects.filter(title=tag_data).first()
-            if not tag:
-                tag = Tag.objects.create(title=tag_data)
-            tag_objects.append(tag)
-
-        snippet.tag.set(tag_objects)
-
-        return snippet
-
+        return self.create(validated_data)
 
     def create(self, validated_data):
         tags_data = validated_data.pop('tag', [])
         snippet = Snippet.objects.create(**validated_data)
+        index_snippets([snippet])
 
-        tag_objects = []
-        for tag_data in tags_data:
-            tag = Tag.objects.filter(title=tag_data).first()
-            if not tag:
-                tag = Tag.objects.create(title=tag_data)
-            tag_objects.append(tag)
-
-        snippet.tag.set(tag_objects) 
+        snippet.tag.set(resolve_tag_ids(tags_data))
 
         return snippet
 
     def update(self, instance, validated_data):
         tags_data = validated_data.pop('tag', [])
+        previous = snippet_index_row(instance)
         
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         
-        tag_objects = []
-        for tag_data in tags_data:
-            tag = Tag.objects.filter(title=tag_data).first()
-            if not tag:
-                tag = Tag.objects.create(title=tag_data)
-            tag_objects.append(tag)
-        
-        instance.tag.set(tag_objects)
+        instance.tag.set(resolve_tag_ids(tags_data))
         
-        instance.save()
+        with transaction.atomic():
+            instance.save()
+            reindex_snippet(previous, instance)
         
         return instance
 
 # Snippet details serializer
-class SnippetSerializerDetail(serializers.ModelSerializer):
+class SnippetSerializerDetail(DynamicFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer):
     tag = serializers.SerializerMethodField()
 
     def get_tag(self, obj):
@@ -108,4 +103,108 @@ class SnippetSerializerDetail(serializers.ModelSerializer):
 
     class Meta:
         model = Snippet
-        fields = ['id','note','title','tag']
\ No newline at end of file
+        fields = ['id','note','title','tag']
+
+    def update(self, instance, validated_data):
+        previous = snippet_index_row(instance)
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            reindex_snippet(previous, instance)
+        return instance
+
+# Snippet sync serializer
+class SnippetSerializerSync(SnippetSerializerDetail):
+    class Meta:
+        model = Snippet
+        fields = ['id','note','title','tag','created_at','updated_at']
+
+
+# Serializer field -> the model fields it reads; tags are prefetched instead
+SNIPPET_FIELD_COLUMNS = {
+    'id': ('id',), 'title': ('title',), 'note': ('note',), 'tag': (),
+    'created_at': ('created_at',), 'updated_at': ('updated_at',),
+}
+
+
+def sparse_snippets(queryset, fields, required=('id',)):
+    """
+    Load only the columns behind the serializer `fields`, plus `required` ones, and prefetch
+    tags only when 'tag' is among them.
+    """
+    columns = {column for field in fields for column in SNIPPET_FIELD_COLUMNS[field]}
+    queryset = queryset.only(*columns.union(required))
+    return queryset.prefetch_related('tag') if 'tag' in fields else queryset
+
+
+# Fast path for the list endpoints: SnippetSerializerListWithLinks and SnippetSerializerDetail
+# without the note, built from values_list() rows instead of model instances. Each output
+# field maps to the column it reads, so a sparse `fields` selection also narrows the SELECT.
+# The note column is only read for an opt-in `note_preview` of its first characters.
+SNIPPET_LINK_COLUMNS = {'id': 'id', 'title': 'title', 'detail_url': 'id', 'created_by': 'created_by__username'}
+SNIPPET_DETAIL_COLUMNS = {'id': 'id', 'title': 'title', 'tag': 'id'}
+SNIPPET_LINK_FIELDS = tuple(SNIPPET_LINK_COLUMNS)
+SNIPPET_DETAIL_FIELDS = tuple(SNIPPET_DETAIL_COLUMNS)
+# Selected for the pagination cursor whatever the fields
+CURSOR_COLUMNS = ('id', 'created_at')
+
+
+def fast_path_rows(queryset, columns, fields, preview=0):
+    names = dict.fromkeys(CURSOR_COLUMNS)
+    names.update(dict.fromkeys(columns[field] for field in fields))
+    if preview:
+        names['note'] = None
+    return queryset.values_list(*names, named=True)
+
+
+def snippet_link_rows(queryset, preview=0, fields=SNIPPET_LINK_FIELDS):
+    return fast_path_rows(queryset, SNIPPET_LINK_COLUMNS, fields, preview)
+
+
+def snippet_detail_rows(queryset, preview=0, fields=SNIPPET_DETAIL_FIELDS):
+    return fast_path_rows(queryset, SNIPPET_DETAIL_COLUMNS, fields, preview)
+
+
+def tag_titles_queryset(snippet_ids):
+    """
+    (snippet_id, title) pairs of the given snippets, one query on the through table.
+    """
+    return Snippet.tag.through.objects.filter(snippet_id__in=snippet_ids).order_by(
+        'snippet_id', 'tag_id').values_list('snippet_id', 'tag__title')
+
+
+def group_tag_titles(pairs):
+    titles = defaultdict(list)
+    for snippet_id, title in pairs:
+        titles[snippet_id].append(title)
+    return titles
+
+
+def serialize_rows(rows, getters, fields, preview):
+    selected = [(field, getters[field]) for field in fields]
+    if preview:
+        selected.append(('note_preview', lambda row: preview_note(row.note, preview)))
+    with timed('serialize'):
+        return [{field: get(row) for field, get in selected} for row in rows]
+
+
+def serialize_snippet_links(rows, preview=0, fields=SNIPPET_LINK_FIELDS):
+    detail_url = settings.BASE_URL + 'api/snippet/detail/'
+    getters = {
+        'id': attrgetter('id'),
+        'title': attrgetter('title'),
+        'detail_url': lambda row: f'{detail_url}{row.id}/',
+        'created_by': attrgetter('created_by__username'),
+    }
+    return serialize_rows(rows, getters, fields, preview)
+
+
+def serialize_snippet_details(rows, titles, preview=0, fields=SNIPPET_DETAIL_FIELDS):
+    """
+    `titles` maps snippet ids to their tag titles, it is only read when 'tag' is in `fields`.
+    """
+    getters = {
+        'id': attrgetter('id'),
+        'title': attrgetter('title'),
+        'tag': lambda row: titles.get(row.id, []),
+    }
+    return serialize_rows(rows, getters, fields, preview)
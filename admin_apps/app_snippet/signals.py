@@ -0,0 +1,34 @@
+# signals.py
+from django.contrib.auth.models import User
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .cache import bump_user_version
+from .instrumentation import install_query_timer
+from .models import Tag
+from .search import unindex_snippets
+from .tags import tag_cache, tag_index
+
+
+@receiver(post_delete, sender=Tag)
+def evict_deleted_tag(sender, instance, **kwargs):
+    tag_cache.delete(instance.title)
+    tag_index.discard(instance.title)
+
+
+@receiver(connection_created)
+def time_queries(sender, connection, **kwargs):
+    install_query_timer(connection)
+
+
+@receiver(pre_delete, sender=User)
+def unindex_user_snippets(sender, instance, using, **kwargs):
+    # Runs in the transaction of the cascade that deletes the user's snippets
+    unindex_snippets(instance.snippets.using(using), using)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def evict_cached_user(sender, instance, **kwargs):
+    bump_user_version(instance.pk)
@@ -0,0 +1,91 @@
+# sync.py
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Snippet, SnippetTombstone
+from .pagination import InvalidCursor, dump_cursor, get_page_size, load_cursor
+
+DEFAULT_RETENTION = timedelta(days=30)
+
+SyncPage = namedtuple('SyncPage', ['changed', 'deleted', 'cursor', 'has_more'])
+
+
+class CursorExpired(Exception):
+    """
+    Raised when tombstones a cursor depends on may already have been purged.
+    """
+
+
+def get_retention():
+    return getattr(settings, 'SNIPPET_TOMBSTONE_RETENTION', DEFAULT_RETENTION)
+
+
+def decode_sync_cursor(value):
+    """
+    Return (change_seq, tombstone id) for a `since` cursor; tombstone id is None when the
+    client has not synced yet.
+    """
+    if not value:
+        return 0, None
+    payload = load_cursor(value)
+    try:
+        change_seq, tombstone_id = int(payload['s']), int(payload['t'])
+        issued_at = parse_datetime(payload['at'])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidCursor(value)
+    if issued_at is None:
+        raise InvalidCursor(value)
+    if issued_at < timezone.now() - get_retention():
+        raise CursorExpired(value)
+    return change_seq, tombstone_id
+
+
+def get_changes(user, params, queryset=None):
+    """
+    Return the user's snippets created or updated after the `since` cursor, in the order
+    they were written (change_seq), and the ids of snippets deleted since then. `queryset`
+    defaults to every snippet with its tags prefetched.
+    """
+    page_size = get_page_size(params)
+    change_seq, tombstone_id = decode_sync_cursor(params.get('since'))
+
+    if queryset is None:
+        queryset = Snippet.objects.prefetch_related('tag')
+    snippets = queryset.filter(created_by=user, change_seq__gt=change_seq)
+    changed = list(snippets.order_by('change_seq')[:page_size + 1])
+
+    tombstones = SnippetTombstone.objects.filter(created_by=user)
+    if tombstone_id is None:
+        # A first sync has nothing to delete, it only needs to skip past existing tombstones
+        tombstone_id = tombstones.order_by('-id').values_list('id', flat=True).first() or 0
+        deleted = []
+    else:
+        deleted = list(tombstones.filter(id__gt=tombstone_id).order_by('id')
+                       .values_list('id', 'snippet_id')[:page_size + 1])
+
+    has_more = len(changed) > page_size or len(deleted) > page_size
+    changed, deleted = changed[:page_size], deleted[:page_size]
+    if changed:
+        change_seq = changed[-1].change_seq
+    if deleted:
+        tombstone_id = deleted[-1][0]
+
+    cursor = dump_cursor({
+        's': change_seq,
+        't': tombstone_id,
+        'at': timezone.now().isoformat(),
+    })
+    return SyncPage(changed, [deleted_id for _, deleted_id in deleted], cursor, has_more)
+
+
+def purge_tombstones(now=None):
+    """
+    Delete tombstones older than SNIPPET_TOMBSTONE_RETENTION and return how many were removed.
+    """
+    cutoff = (now or timezone.now()) - get_retention()
+    deleted, _ = SnippetTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,224 @@
+# tags.py
+import bisect
+import heapq
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from rest_framework.exceptions import ValidationError
+
+from .models import Tag
+from .utils import LRUCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_TTL = 300
+# Prefixes this short match a large share of the vocabulary, their results are memoized
+MEMO_PREFIX_LENGTH = 2
+
+# Tag title -> id, shared by every request served by this process
+tag_cache = LRUCache(getattr(settings, 'SNIPPET_TAG_CACHE_SIZE', 10000))
+
+
+class TagIndex:
+    """
+    Process-local, case-insensitive prefix index of tag titles for autocomplete: titles kept
+    sorted by their lowercased form, so a prefix is a bisected range, ranked by snippet count.
+    Loaded in a background thread (see warm()), updated incrementally as tags are created or
+    deleted, and reloaded after SNIPPET_TAG_INDEX_TTL seconds to refresh the counts.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.keys, self.titles, self.counts = [], [], []
+        self.memo = {}
+        self.loaded_at = None
+        self.loading = False
+
+    @property
+    def is_warm(self):
+        return self.loaded_at is not None
+
+    def is_stale(self):
+        ttl = getattr(settings, 'SNIPPET_TAG_INDEX_TTL', DEFAULT_INDEX_TTL)
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > ttl
+
+    def load(self):
+        rows = sorted(
+            (title.lower(), title, count)
+            for title, count in Tag.objects.values_list('title', 'snippet_count').iterator(chunk_size=10000))
+        keys, titles, counts = (list(column) for column in zip(*rows)) if rows else ([], [], [])
+        with self.lock:
+            self.keys, self.titles, self.counts = keys, titles, counts
+            self.memo = {}
+            self.loaded_at = time.monotonic()
+
+    def warm(self):
+        """
+        Start loading the index in a background thread unless it is fresh or already loading.
+        """
+        with self.lock:
+            if self.loading or not self.is_stale():
+                return
+            self.loading = True
+
+        def run():
+            try:
+                self.load()
+            except Exception:
+                logger.exception('Loading the tag index failed')
+            finally:
+                self.loading = False
+                connection.close()
+
+        threading.Thread(target=run, name='tag-index', daemon=True).start()
+
+    def add(self, titles):
+        with self.lock:
+            if not self.is_warm:
+                return
+            for title in titles:
+                key = title.lower()
+                index = bisect.bisect_left(self.keys, key)
+                while index < len(self.keys) and self.keys[index] == key:
+                    if self.titles[index] == title:
+                        break
+                    index += 1
+                else:
+                    self.keys.insert(index, key)
+                    self.titles.insert(index, title)
+                    self.counts.insert(index, 0)
+                    self.forget(key)
+
+    def discard(self, title):
+        with self.lock:
+            key = title.lower()
+            index = bisect.bisect_left(self.keys, key)
+            while index < len(self.keys) and self.keys[index] == key:
+                if self.titles[index] == title:
+                    del self.keys[index], self.titles[index], self.counts[index]
+                    self.forget(key)
+                    return
+                index += 1
+
+    def forget(self, key):
+        # Drop the memoized results that `key` belongs to, the caller holds the lock
+        self.memo = {
+            memo_key: result for memo_key, result in self.memo.items() if not key.startswith(memo_key[0])}
+
+    def clear(self):
+        with self.lock:
+            self.keys, self.titles, self.counts = [], [], []
+            self.memo = {}
+            self.loaded_at = None
+
+    def search(self, prefix, limit):
+        """
+        Return up to `limit` (title, snippet_count) pairs whose title starts with `prefix`,
+        most used first, then alphabetically.
+        """
+        key = prefix.lower()
+        memoize = len(key) <= MEMO_PREFIX_LENGTH
+        with self.lock:
+            if memoize and (key, limit) in self.memo:
+                return self.memo[(key, limit)]
+            low = bisect.bisect_left(self.keys, key)
+            high = bisect.bisect_left(self.keys, key[:-1] + chr(ord(key[-1]) + 1)) if key else len(self.keys)
+            counts = self.counts
+            best = heapq.nsmallest(limit, range(low, high), key=lambda index: (-counts[index], index))
+            result = [(self.titles[index], counts[index]) for index in best]
+            if memoize:
+                self.memo[(key, limit)] = result
+            return result
+
+
+tag_index = TagIndex()
+
+
+def resolve_tag_ids(titles):
+    """
+    Return the ids of the tags with the given titles, creating the missing ones.
+    Costs at most three queries however many titles are passed, and none when all are cached.
+    """
+    titles = list(dict.fromkeys(titles))
+    ids = tag_cache.get_many(titles)
+    missing = [title for title in titles if title not in ids]
+    if missing:
+        found = dict(Tag.objects.filter(title__in=missing).values_list('title', 'id'))
+        new = [title for title in missing if title not in found]
+        if new:
+            # Another writer may create the same titles concurrently, so let the unique
+            # constraint settle it and read the ids back.
+            Tag.objects.bulk_create([Tag(title=title) for title in new], ignore_conflicts=True)
+            found.update(Tag.objects.filter(title__in=new).values_list('title', 'id'))
+        ids.update(found)
+        # Only remember ids once they are committed, a rollback would leave them dangling
+        transaction.on_commit(lambda: tag_cache.set_many(found))
+        if new:
+            transaction.on_commit(lambda: tag_index.add(new))
+    return [ids[title] for title in titles]
+
+
+def autocomplete_tags(prefix, limit):
+    """
+    Return up to `limit` (title, snippet_count) pairs of tags starting with `prefix`, most
+    used first, from the in-memory index, or with a LIKE query while it is cold.
+    """
+    if tag_index.is_stale():
+        tag_index.warm()
+    if tag_index.is_warm:
+        return tag_index.search(prefix, limit)
+    return list(Tag.objects.filter(title__istartswith=prefix).order_by('-snippet_count', 'title')
+                .values_list('title', 'snippet_count')[:limit])
+
+
+def parse_tag_query(query):
+    """
+    Split a query such as "python AND django NOT legacy" into (all, any, none): the required
+    titles, a list of OR-groups each needing at least one match, and the excluded titles.
+    OR binds tighter than AND, so "a OR b AND c OR d" reads as (a OR b) AND (c OR d), and
+    operators are matched in any case. NOT cannot be part of an OR-group.
+    """
+    clauses = []
+    joined = False
+    negated = False
+    for word in query.split():
+        operator = word.upper()
+        if operator in ('AND', 'OR', 'NOT'):
+            joined = joined or operator == 'OR'
+            negated = negated or operator == 'NOT'
+            continue
+        if joined and clauses:
+            clauses[-1].append((negated, word))
+        else:
+            clauses.append([(negated, word)])
+        joined = negated = False
+
+    required, groups, excluded = [], [], []
+    for clause in clauses:
+        if len(clause) == 1:
+            negated, title = clause[0]
+            (excluded if negated else required).append(title)
+        elif any(negated for negated, _ in clause):
+            raise ValidationError("NOT cannot be combined with OR")
+        else:
+            groups.append([title for _, title in clause])
+    return required, groups, excluded
+
+
+def filter_by_tags(queryset, required=(), groups=(), excluded=()):
+    """
+    Narrow a Snippet queryset with subqueries on the tag through table, so the whole
+    filter runs as a single SQL statement. `groups` is a list of OR-groups of titles.
+    """
+    Through = queryset.model.tag.through
+    for title in dict.fromkeys(required):
+        queryset = queryset.filter(id__in=Through.objects.filter(tag__title=title).values('snippet_id'))
+    for group in groups:
+        queryset = queryset.filter(
+            id__in=Through.objects.filter(tag__title__in=group).values('snippet_id'))
+    if excluded:
+        queryset = queryset.exclude(
+            id__in=Through.objects.filter(tag__title__in=excluded).values('snippet_id'))
+    return queryset
@@ -1,3 +1,1241 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import time
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.servers.basehttp import get_internal_wsgi_application
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import *
+from .authentication import user_cache
+from .counters import get_snippet_count, verify_counters
+from .fields import COMPRESSED, PLAIN, compress_note, preview_note
+from .renderers import FastJSONRenderer, TimedFastJSONRenderer
+from .routers import ReplicaRouter, replica_reads
+from .search import build_match_expression, index_snippets, rebuild_search_index, reindex_snippet, snippet_index_row
+from .serializers import *
+from .cache import bump_user_version, cache_stats, get_response_cache
+from .instrumentation import route_stats
+from .tags import parse_tag_query, tag_cache, tag_index
+from .warmup import warm_up
+from .management.commands.serve import SnipBoxServer, post_request, pre_request
+
+
+def make_snippets(user, count, tags=(), start=None):
+    """
+    Bulk create `count` snippets for `user`, one second apart and newest last.
+    """
+    start = start or timezone.now() - timedelta(days=1)
+    snippets = Snippet.objects.bulk_create(
+        Snippet(title=f'snippet {i}', note=f'note {i}', created_by=user) for i in range(count))
+    index_snippets(snippets)
+    for i, snippet in enumerate(snippets):
+        snippet.created_at = start + timedelta(seconds=i)
+    Snippet.objects.bulk_update(snippets, ['created_at'], batch_size=1000)
+    if tags:
+        Through = Snippet.tag.through
+        Through.objects.bulk_create(
+            [Through(snippet_id=snippet.id, tag_id=tag.id) for snippet in snippets for tag in tags],
+            batch_size=1000)
+    return snippets
+
+
+# A test mirror is a second connection, which cannot see the rows of a TestCase transaction,
+# so the replica stays off here even with SNIPBOX_DB_MODE=production
+no_replica = override_settings(SNIPPET_REPLICA_DATABASE=None)
+
+
+@no_replica
+class SnippetAPITestCase(TestCase):
+
+    def setUp(self):
+        get_response_cache().clear()
+        cache_stats.clear()
+        user_cache.clear()
+        self.user = User.objects.create_user(username='alice', password='secret-pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+class KeysetPaginationTests(SnippetAPITestCase):
+
+    def test_overview_walks_every_page_in_order(self):
+        snippets = make_snippets(self.user, 7)
+        expected = [snippet.id for snippet in reversed(snippets)]
+
+        seen, cursor = [], None
+        while True:
+            params = {'page_size': 3}
+            if cursor:
+                params['cursor'] = cursor
+            body = self.client.get(reverse('overview-api'), params).json()
+            self.assertEqual(body['data']['total_count'], 7)
+            seen += [row['id'] for row in body['data']['snippets']]
+            cursor = body['data']['next']
+            if not cursor:
+                break
+        self.assertEqual(seen, expected)
+
+    def test_previous_cursor_returns_the_prior_page(self):
+        make_snippets(self.user, 5)
+        first = self.client.get(reverse('overview-api'), {'page_size': 2}).json()['data']
+        self.assertIsNone(first['previous'])
+        second = self.client.get(
+            reverse('overview-api'), {'page_size': 2, 'cursor': first['next']}).json()['data']
+        back = self.client.get(
+            reverse('overview-api'), {'page_size': 2, 'cursor': second['previous']}).json()['data']
+        self.assertEqual(back['snippets'], first['snippets'])
+        self.assertIsNone(back['previous'])
+
+    def test_ties_on_created_at_are_broken_by_id(self):
+        snippets = make_snippets(self.user, 4)
+        Snippet.objects.update(created_at=snippets[0].created_at)
+        first = self.client.get(reverse('overview-api'), {'page_size': 2}).json()['data']
+        second = self.client.get(
+            reverse('overview-api'), {'page_size': 2, 'cursor': first['next']}).json()['data']
+        ids = [row['id'] for row in first['snippets'] + second['snippets']]
+        self.assertEqual(ids, sorted((s.id for s in snippets), reverse=True))
+
+    def test_page_size_is_capped(self):
+        make_snippets(self.user, 5)
+        with self.settings(SNIPPET_MAX_PAGE_SIZE=2):
+            body = self.client.get(reverse('overview-api'), {'page_size': 100}).json()
+        self.assertEqual(len(body['data']['snippets']), 2)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse('overview-api'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_filter_by_tag_is_paginated(self):
+        tag = Tag.objects.create(title='python')
+        make_snippets(self.user, 3, tags=[tag])
+        first = self.client.post(
+            reverse('filter-tags-api'), {'tag': 'python', 'page_size': 2}, format='json').json()
+        self.assertEqual(len(first['data']['snippets']), 2)
+        second = self.client.post(
+            reverse('filter-tags-api'),
+            {'tag': 'python', 'page_size': 2, 'cursor': first['data']['next']}, format='json').json()
+        self.assertEqual(len(second['data']['snippets']), 1)
+        self.assertIsNone(second['data']['next'])
+
+
+class QueryBudgetTests(SnippetAPITestCase):
+    """
+    Every read endpoint must run a fixed number of queries however many snippets it returns.
+    """
+    sizes = (10, 1000, 10000)
+
+    def setUp(self):
+        super().setUp()
+        self.tags = [Tag.objects.create(title='python'), Tag.objects.create(title='django')]
+        self.snippets = []
+
+    def grow_to(self, size):
+        self.snippets += make_snippets(self.user, size - len(self.snippets), tags=self.tags)
+
+    def assertBudget(self, queries, request, sizes=None):
+        for size in sizes or self.sizes:
+            self.grow_to(size)
+            get_response_cache().clear()
+            with self.subTest(size=size), self.assertNumQueries(queries):
+                response = request()
+            self.assertEqual(response.status_code, 200)
+
+    def test_overview(self):
+        # validators (which include the count) + page with the author joined in
+        self.assertBudget(2, lambda: self.client.get(reverse('overview-api'), {'page_size': 500}))
+
+    def test_detail(self):
+        # validators + snippet + its tags
+        self.assertBudget(3, lambda: self.client.get(
+            reverse('snippet-details-api', args=[self.snippets[-1].id])))
+
+    def test_filter_by_tag(self):
+        # page + tags for the page
+        self.assertBudget(2, lambda: self.client.post(
+            reverse('filter-tags-api'), {'tag': 'python', 'page_size': 500}, format='json'))
+
+    def test_delete(self):
+        # savepoint, rows for the search index, its delete, cascade collection, two deletes, release,
+        # remaining count
+        def delete():
+            return self.client.post(
+                reverse('delete-snippet-api'), {'snippet_id': self.snippets.pop().id}, format='json')
+        self.assertBudget(8, delete)
+
+    def test_delete_many(self):
+        # as above, however many ids
+        def delete():
+            ids, self.snippets[-10:] = [snippet.id for snippet in self.snippets[-10:]], []
+            return self.client.post(reverse('delete-snippet-api'), {'snippet_ids': ids}, format='json')
+        self.assertBudget(8, delete, sizes=(10, 1000))
+
+    def test_delete_by_tag(self):
+        # as above, the tag is a subquery of the rows read
+        stale = Tag.objects.create(title='stale')
+        Through = Snippet.tag.through
+        for size in (10, 1000):
+            self.grow_to(size)
+            Through.objects.bulk_create(
+                Through(snippet_id=snippet.id, tag_id=stale.id) for snippet in self.snippets[-10:])
+            get_response_cache().clear()
+            with self.subTest(size=size), self.assertNumQueries(8):
+                response = self.client.post(reverse('delete-snippet-api'), {'tag': 'stale'}, format='json')
+            self.assertEqual(response.json()['data']['deleted_count'], 10)
+            self.snippets[-10:] = []
+
+    def test_delete_including_remaining(self):
+        # as above, then the remaining snippets + their tags
+        def delete():
+            return self.client.post(
+                reverse('delete-snippet-api'),
+                {'snippet_id': self.snippets.pop().id, 'include_remaining': True}, format='json')
+        self.assertBudget(10, delete)
+
+
+class QueryPlanTests(SnippetAPITestCase):
+    """
+    EXPLAIN QUERY PLAN every statement an endpoint runs and fail on a full table scan or a
+    temp B-tree sort, so an index regression shows up here rather than in production.
+    """
+    def setUp(self):
+        super().setUp()
+        other = User.objects.create_user(username='bob')
+        tags = [Tag.objects.create(title=title) for title in ('python', 'django', 'legacy')]
+        self.snippets = make_snippets(self.user, 30, tags=tags[:2]) + make_snippets(other, 30, tags=tags[1:])
+
+    def plans(self, request):
+        queries = []
+
+        def collect(execute, sql, params, many, context):
+            queries.append((sql, params[0] if many else params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(collect):
+            response = request()
+            if getattr(response, 'streaming', False):
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 300)
+        with connection.cursor() as cursor:
+            for sql, params in queries:
+                if sql.startswith(('SAVEPOINT', 'RELEASE')):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                yield sql, [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexed(self, request, allow=()):
+        for sql, plan in self.plans(request):
+            for step in plan:
+                if any(allowed in step for allowed in allow):
+                    continue
+                with self.subTest(sql=sql, step=step):
+                    self.assertNotIn('TEMP B-TREE', step)
+                    self.assertFalse(
+                        step.startswith('SCAN ') and ' USING ' not in step and 'VIRTUAL TABLE' not in step
+                        and step != 'SCAN CONSTANT ROW', 'full table scan')
+
+    def test_read_endpoints(self):
+        cursor = self.client.get(reverse('overview-api'), {'page_size': 5}).data['data']['next']
+        self.assertIndexed(lambda: self.client.get(reverse('overview-api'), {'page_size': 5}))
+        self.assertIndexed(lambda: self.client.get(reverse('overview-api'), {'cursor': cursor}))
+        self.assertIndexed(lambda: self.client.get(reverse('snippet-details-api', args=[self.snippets[0].id])))
+        self.assertIndexed(lambda: self.client.get(reverse('sync-snippet-api')))
+        self.assertIndexed(lambda: self.client.get(reverse('export-snippet-api'), {'format': 'ndjson'}))
+        for body in ({'tag': 'python'}, {'query': 'python AND django NOT legacy'}, {'any': ['python', 'legacy']}):
+            self.assertIndexed(lambda: self.client.post(
+                reverse('filter-tags-api'), dict(body, page_size=5), format='json'))
+        # Ranked by bm25(), which no index can order by
+        self.assertIndexed(lambda: self.client.get(reverse('search-snippet-api'), {'q': 'snippet'}),
+                           allow=['ORDER BY'])
+
+    def test_write_endpoints(self):
+        self.assertIndexed(lambda: self.client.post(
+            reverse('delete-snippet-api'), {'snippet_id': self.snippets[0].id}, format='json'))
+        self.assertIndexed(lambda: self.client.post(
+            reverse('delete-snippet-api'), {'tag': 'python', 'created_before': timezone.now().isoformat()},
+            format='json'))
+        self.assertIndexed(lambda: self.client.put(
+            reverse('update-snippet-api', args=[self.snippets[-1].id]), {'title': 'new'}, format='json'))
+
+
+class TagResolutionTests(SnippetAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        tag_cache.clear()
+        self.addCleanup(tag_cache.clear)
+
+    def create(self, tags):
+        with CaptureQueriesContext(connection) as queries, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('create-snippet-api'), {'title': 't', 'note': 'n', 'tag': tags}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.json()['data']['tag']), sorted(set(tags)))
+        return len(queries)
+
+    def test_query_count_does_not_depend_on_tag_count(self):
+        one = self.create(['solo'])
+        twenty = self.create([f'tag-{i}' for i in range(20)])
+        self.assertEqual(one, twenty)
+
+    def test_existing_and_duplicate_titles_are_reused(self):
+        Tag.objects.create(title='python')
+        self.create(['python', 'django', 'python'])
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_cached_titles_skip_the_lookup(self):
+        tags = [f'tag-{i}' for i in range(20)]
+        cold = self.create(tags)
+        warm = self.create(tags)
+        self.assertEqual(cold - warm, 3)
+
+    def test_deleted_tags_are_evicted(self):
+        self.create(['python'])
+        Tag.objects.filter(title='python').delete()
+        self.assertEqual(tag_cache.get_many(['python']), {})
+        self.create(['python'])
+
+
+class BulkImportTests(SnippetAPITestCase):
+
+    def post_lines(self, lines):
+        body = '\n'.join(line if isinstance(line, str) else json.dumps(line) for line in lines)
+        return self.client.post(
+            reverse('bulk-import-snippet-api'), data=body.encode(), content_type='application/x-ndjson')
+
+    def test_imports_snippets_and_tags_in_chunks(self):
+        lines = [{'title': f't{i}', 'note': 'n', 'tag': ['bulk', f'tag-{i % 3}']} for i in range(25)]
+        with self.settings(SNIPPET_BULK_IMPORT_CHUNK_SIZE=10):
+            response = self.post_lines(lines)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data'], {'created': 25, 'failed': 0, 'errors': []})
+        self.assertEqual(Snippet.objects.filter(created_by=self.user).count(), 25)
+        self.assertEqual(Tag.objects.get(title='bulk').snippets.count(), 25)
+        self.assertEqual(Snippet.objects.get(title='t4').tag.get(title='tag-1').title, 'tag-1')
+
+    def test_reports_errors_per_line(self):
+        response = self.post_lines([
+            {'title': 'ok', 'note': 'n', 'tag': []},
+            '{not json',
+            {'title': 'missing note', 'tag': []},
+            '',
+            '[1, 2]',
+        ])
+        data = response.json()['data']
+        self.assertEqual((data['created'], data['failed']), (1, 3))
+        self.assertEqual([error['line'] for error in data['errors']], [2, 3, 5])
+        self.assertIn('note', data['errors'][1]['errors'])
+
+    def test_rejects_a_body_without_valid_lines(self):
+        response = self.post_lines(['{not json'])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Snippet.objects.exists())
+
+
+class ExportTests(SnippetAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        tag = Tag.objects.create(title='python')
+        self.snippets = make_snippets(self.user, 5, tags=[tag])
+        make_snippets(User.objects.create_user(username='bob'), 3)
+
+    def export(self, **params):
+        response = self.client.get(reverse('export-snippet-api'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson_is_the_default(self):
+        response, body = self.export()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [snippet.id for snippet in self.snippets])
+        self.assertEqual(rows[0]['tag'], ['python'])
+        self.assertEqual(rows[0]['note'], 'note 0')
+
+    def test_csv(self):
+        response, body = self.export(format='csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(body.splitlines()))
+        self.assertEqual(rows[0], ['id', 'title', 'note', 'created_at', 'updated_at', 'tag'])
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[1][5], 'python')
+
+    def test_reads_in_chunks(self):
+        with self.settings(SNIPPET_EXPORT_CHUNK_SIZE=2):
+            response = self.client.get(reverse('export-snippet-api'))
+            # one streamed select, plus the tags of each of the three chunks
+            with self.assertNumQueries(4):
+                b''.join(response.streaming_content)
+
+
+class TagAutocompleteTests(SnippetAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        tag_index.clear()
+        self.addCleanup(tag_index.clear)
+        for title, count in (('python', 3), ('Pyramid', 2), ('pytest', 1), ('django', 5)):
+            make_snippets(self.user, count, tags=[Tag.objects.create(title=title)])
+
+    def autocomplete(self, q, **params):
+        return self.client.get(reverse('tag-autocomplete-api'), {'q': q, **params}).json()['data']
+
+    def test_cold_index_falls_back_to_sql(self):
+        with mock.patch.object(tag_index, 'warm') as warm, CaptureQueriesContext(connection) as queries:
+            data = self.autocomplete('py')
+        warm.assert_called_once_with()
+        self.assertIn('LIKE', queries[-1]['sql'])
+        self.assertEqual(data, [{'title': 'python', 'snippet_count': 3}, {'title': 'Pyramid', 'snippet_count': 2},
+                                {'title': 'pytest', 'snippet_count': 1}])
+
+    def test_warm_index_ranks_by_usage_without_queries(self):
+        tag_index.load()
+        with self.assertNumQueries(0):
+            data = self.autocomplete('PY', limit=2)
+        self.assertEqual([tag['title'] for tag in data], ['python', 'Pyramid'])
+        self.assertEqual(self.autocomplete('d'), [{'title': 'django', 'snippet_count': 5}])
+        self.assertEqual(self.autocomplete('rust'), [])
+
+    def test_index_follows_created_and_deleted_tags(self):
+        tag_index.load()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('create-snippet-api'),
+                             {'title': 't', 'note': 'n', 'tag': ['pyodide', 'python']}, format='json')
+        self.assertEqual(self.autocomplete('pyo'), [{'title': 'pyodide', 'snippet_count': 0}])
+        Tag.objects.get(title='Pyramid').delete()
+        self.assertEqual([tag['title'] for tag in self.autocomplete('py')], ['python', 'pytest', 'pyodide'])
+
+
+class SearchTests(SnippetAPITestCase):
+
+    def search(self, q, **params):
+        return self.client.get(reverse('search-snippet-api'), {'q': q, **params}).json()['data']
+
+    def create(self, title, note):
+        response = self.client.post(
+            reverse('create-snippet-api'), {'title': title, 'note': note, 'tag': []}, format='json')
+        return Snippet.objects.get(title=response.json()['data']['title'])
+
+    def test_ranks_matches_and_scopes_to_the_user(self):
+        weak = self.create('shell tips', 'grep and sed, also python once')
+        strong = self.create('python python', 'python decorators in python')
+        index_snippets([Snippet.objects.create(title='python', note='python', created_by=User.objects.create_user('bob'))])
+        self.assertEqual([row['id'] for row in self.search('python')['snippets']], [strong.id, weak.id])
+        self.assertEqual(self.search('python grep')['snippets'][0]['id'], weak.id)
+
+    def test_match_is_scoped_to_the_owner(self):
+        mine = self.create('python', 'u1 owner:u2')
+        bob = User.objects.create_user('bob')
+        theirs = Snippet.objects.create(title='python', note='python', created_by=bob)
+        index_snippets([theirs])
+
+        def matched(user):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT rowid FROM app_snippet_snippet_fts WHERE app_snippet_snippet_fts MATCH %s',
+                               [build_match_expression('python', user.pk)])
+                return {row[0] for row in cursor.fetchall()}
+
+        self.assertEqual(matched(self.user), {mine.id})
+        self.assertEqual(matched(bob), {theirs.id})
+        previous = snippet_index_row(theirs)
+        theirs.created_by = self.user
+        theirs.save()
+        reindex_snippet(previous, theirs)
+        self.assertEqual(matched(self.user), {mine.id, theirs.id})
+        self.assertEqual(matched(bob), set())
+
+    def test_deleting_a_user_unindexes_their_snippets(self):
+        bob = User.objects.create_user('bob')
+        make_snippets(bob, 3)
+        bob.delete()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM app_snippet_snippet_fts WHERE app_snippet_snippet_fts MATCH 'note'")
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_index_follows_updates_and_deletes(self):
+        snippet = self.create('first title', 'plain note')
+        self.client.put(
+            reverse('update-snippet-api', args=[snippet.id]), {'title': 'renamed'}, format='json')
+        self.assertEqual(self.search('first'), [])
+        self.assertEqual(len(self.search('renamed')['snippets']), 1)
+        self.client.post(reverse('delete-snippet-api'), {'snippet_id': snippet.id}, format='json')
+        self.assertEqual(self.search('renamed'), [])
+
+    def test_cursor_pages_through_results(self):
+        for i in range(5):
+            self.create(f'django {i}', 'django ' * (i + 1))
+        seen, cursor = [], None
+        while True:
+            data = self.search('django', page_size=2, **({'cursor': cursor} if cursor else {}))
+            seen += [row['id'] for row in data['snippets']]
+            cursor = data['next']
+            if not cursor:
+                break
+        self.assertEqual(len(set(seen)), 5)
+
+    def test_query_syntax_is_matched_literally(self):
+        self.create('c++ AND "quotes"', 'NOT an operator')
+        self.assertEqual(len(self.search('"quotes" NOT')['snippets']), 1)
+
+    def test_no_trigger_needs_a_python_function(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")
+            triggers = dict(cursor.fetchall())
+        self.assertNotIn('app_snippet_snippet_fts_ai', triggers)
+        self.assertFalse([name for name, sql in triggers.items() if 'snippet_note' in sql])
+
+    def test_bulk_rows_and_rebuilds_are_indexed(self):
+        make_snippets(self.user, 3)
+        self.assertEqual(len(self.search('note')['snippets']), 3)
+        snippet = Snippet.objects.create(title='kept', note='needle', created_by=self.user)
+        Snippet.objects.filter(pk=snippet.pk).update(title='bypassed')
+        self.assertEqual(self.search('bypassed'), [])
+        self.assertEqual(rebuild_search_index(), 4)
+        self.assertEqual(self.search('bypassed')['snippets'][0]['id'], snippet.id)
+        self.assertEqual(self.search('kept'), [])
+
+
+class TagFilterTests(SnippetAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        python, django, legacy = (Tag.objects.create(title=t) for t in ('python', 'django', 'legacy'))
+        self.plain = make_snippets(self.user, 1, tags=[python])[0]
+        self.web = make_snippets(self.user, 1, tags=[python, django])[0]
+        self.old = make_snippets(self.user, 1, tags=[python, django, legacy])[0]
+        self.go = make_snippets(self.user, 1, tags=[Tag.objects.create(title='go')])[0]
+
+    def filter(self, body):
+        response = self.client.post(reverse('filter-tags-api'), body, format='json')
+        if response.status_code != 200:
+            return set()
+        return {row['id'] for row in response.json()['data']['snippets']}
+
+    def test_query_string(self):
+        self.assertEqual(self.filter({'query': 'python AND django NOT legacy'}), {self.web.id})
+        self.assertEqual(self.filter({'query': 'django OR go'}), {self.web.id, self.old.id, self.go.id})
+        self.assertEqual(self.filter({'query': 'python AND legacy OR go'}), {self.old.id})
+        self.assertEqual(self.filter({'query': 'legacy OR go AND python OR go'}), {self.old.id, self.go.id})
+        self.assertEqual(self.filter({'query': 'go OR plain AND legacy OR django'}), set())
+        self.assertEqual(self.filter({'query': 'python and django not legacy'}), {self.web.id})
+
+    def test_parse_tag_query(self):
+        self.assertEqual(parse_tag_query('a OR b AND c OR d'), ([], [['a', 'b'], ['c', 'd']], []))
+        self.assertEqual(parse_tag_query('a or b c NOT d'), (['c'], [['a', 'b']], ['d']))
+        response = self.client.post(reverse('filter-tags-api'), {'query': 'python OR NOT legacy'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['message'], 'NOT cannot be combined with OR')
+        response = self.client.post(reverse('filter-tags-api'), {'query': 'NOT legacy OR go'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_explicit_lists(self):
+        self.assertEqual(self.filter({'all': ['python'], 'none': ['django']}), {self.plain.id})
+        self.assertEqual(self.filter({'any': ['legacy', 'go']}), {self.old.id, self.go.id})
+        self.assertEqual(self.filter({'tag': 'go'}), {self.go.id})
+        self.assertEqual(self.filter({'tag': 'missing'}), set())
+
+    def test_runs_a_single_query_per_page(self):
+        # page + tags for the page
+        with self.assertNumQueries(2):
+            self.filter({'query': 'python AND django NOT legacy'})
+
+    def test_tag_counts_follow_writes(self):
+        counts = lambda: {t['title']: t['snippet_count']
+                          for t in self.client.get(reverse('list-tags-api')).json()['data']}
+        self.assertEqual(counts(), {'python': 3, 'django': 2, 'legacy': 1, 'go': 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('create-snippet-api'),
+                             {'title': 't', 'note': 'n', 'tag': ['go', 'rust']}, format='json')
+        self.client.post(reverse('delete-snippet-api'), {'snippet_id': self.old.id}, format='json')
+        self.assertEqual(counts(), {'python': 2, 'django': 1, 'legacy': 0, 'go': 2, 'rust': 1})
+
+
+class ResponseCacheTests(SnippetAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.snippet = make_snippets(self.user, 1)[0]
+
+    def test_repeated_reads_are_served_from_cache(self):
+        # overview and detail still compute their validators
+        for name, args, queries in (('overview-api', [], 1), ('list-tags-api', [], 0),
+                                    ('snippet-details-api', [self.snippet.id], 1)):
+            first = self.client.get(reverse(name, args=args)).json()
+            with self.assertNumQueries(queries):
+                second = self.client.get(reverse(name, args=args)).json()
+            self.assertEqual(first, second)
+
+    def test_writes_bump_the_generation(self):
+        self.client.get(reverse('overview-api'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('create-snippet-api'),
+                             {'title': 'fresh', 'note': 'n', 'tag': ['new']}, format='json')
+        overview = self.client.get(reverse('overview-api')).json()['data']
+        self.assertEqual(overview['total_count'], 2)
+        tags = self.client.get(reverse('list-tags-api')).json()['data']
+        self.assertEqual([tag['title'] for tag in tags], ['new'])
+
+        detail_url = reverse('snippet-details-api', args=[self.snippet.id])
+        self.client.get(detail_url)
+        self.client.put(reverse('update-snippet-api', args=[self.snippet.id]),
+                        {'title': 'renamed'}, format='json')
+        self.assertEqual(self.client.get(detail_url).json()['data'][0]['title'], 'renamed')
+
+    def test_body_follows_the_etag_before_the_generation_is_bumped(self):
+        first = self.client.get(reverse('overview-api'))
+        # A write that has committed but not bumped the generation yet
+        make_snippets(self.user, 1)
+        second = self.client.get(reverse('overview-api'))
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second.json()['data']['total_count'], 2)
+
+        detail_url = reverse('snippet-details-api', args=[self.snippet.id])
+        self.client.get(detail_url)
+        Snippet.objects.filter(id=self.snippet.id).update(title='renamed', updated_at=timezone.now())
+        self.assertEqual(self.client.get(detail_url).json()['data'][0]['title'], 'renamed')
+
+    def test_user_scoped_entries_are_not_shared(self):
+        detail_url = reverse('snippet-details-api', args=[self.snippet.id])
+        self.assertTrue(self.client.get(detail_url).json()['status'])
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user(username='bob'))
+        self.assertFalse(other.get(detail_url).json()['status'])
+
+    def test_stats(self):
+        self.client.get(reverse('overview-api'))
+        self.client.get(reverse('overview-api'))
+        admin = APIClient()
+        admin.force_authenticate(User.objects.create_user(username='root', is_staff=True))
+        stats = admin.get(reverse('cache-stats-api')).json()['data']
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_ratio']), (1, 1, 0.5))
+        self.assertEqual(self.client.get(reverse('cache-stats-api')).status_code, 403)
+
+
+class ConditionalGetTests(SnippetAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.snippet = make_snippets(self.user, 2)[-1]
+
+    def test_matching_etag_returns_not_modified(self):
+        for url in (reverse('overview-api'), reverse('snippet-details-api', args=[self.snippet.id])):
+            etag = self.client.get(url)['ETag']
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b'')
+
+    def test_etag_changes_with_the_data(self):
+        url = reverse('overview-api')
+        etag = self.client.get(url)['ETag']
+        self.client.put(reverse('update-snippet-api', args=[self.snippet.id]), {'title': 'x'}, format='json')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        etag = self.client.get(url)['ETag']
+        Snippet.objects.filter(id=self.snippet.id).delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_pages_have_distinct_etags(self):
+        url = reverse('overview-api')
+        self.assertNotEqual(self.client.get(url, {'page_size': 1})['ETag'], self.client.get(url)['ETag'])
+
+    def test_last_modified_moves_on_delete(self):
+        url = reverse('overview-api')
+        Snippet.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        last_modified = self.client.get(url)['Last-Modified']
+        Snippet.objects.filter(id=self.snippet.id).delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+    def test_if_modified_since(self):
+        url = reverse('snippet-details-api', args=[self.snippet.id])
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+
+class SyncTests(SnippetAPITestCase):
+
+    def sync(self, since=None, **params):
+        if since:
+            params['since'] = since
+        response = self.client.get(reverse('sync-snippet-api'), params)
+        return response.status_code, response.json()['data']
+
+    def test_feed_returns_only_changes_since_the_cursor(self):
+        tag = Tag.objects.create(title='python')
+        first, second = make_snippets(self.user, 2, tags=[tag])
+        Snippet.objects.create(title='other', note='n', created_by=User.objects.create_user('bob'))
+        _, data = self.sync()
+        self.assertEqual([row['id'] for row in data['changed']], [first.id, second.id])
+        self.assertEqual(data['changed'][0]['tag'], ['python'])
+        self.assertEqual(data['deleted'], [])
+
+        _, data = self.sync(data['cursor'])
+        self.assertEqual((data['changed'], data['deleted']), ([], []))
+
+        self.client.put(reverse('update-snippet-api', args=[first.id]), {'title': 'x'}, format='json')
+        self.client.post(reverse('delete-snippet-api'), {'snippet_id': second.id}, format='json')
+        _, data = self.sync(data['cursor'])
+        self.assertEqual([row['id'] for row in data['changed']], [first.id])
+        self.assertEqual(data['deleted'], [second.id])
+
+    def test_feed_follows_write_order_not_updated_at(self):
+        first, second = make_snippets(self.user, 2)
+        _, data = self.sync()
+        # A write that keeps updated_at, and one whose updated_at sorts before the cursor
+        Snippet.objects.filter(pk=first.pk).update(title='bulk renamed')
+        Snippet.objects.filter(pk=second.pk).update(updated_at=timezone.now() - timedelta(days=1))
+        _, data = self.sync(data['cursor'])
+        self.assertEqual([row['id'] for row in data['changed']], [first.id, second.id])
+        self.assertEqual(self.sync(data['cursor'])[1]['changed'], [])
+
+    def test_first_sync_skips_old_tombstones(self):
+        make_snippets(self.user, 1)[0].delete()
+        self.assertEqual(SnippetTombstone.objects.filter(created_by=self.user).count(), 1)
+        self.assertEqual(self.sync()[1]['deleted'], [])
+
+    def test_pages_with_has_more(self):
+        make_snippets(self.user, 5)
+        seen, cursor = [], None
+        while True:
+            _, data = self.sync(cursor, page_size=2)
+            seen += [row['id'] for row in data['changed']]
+            cursor = data['cursor']
+            if not data['has_more']:
+                break
+        self.assertEqual(len(set(seen)), 5)
+
+    def test_expired_cursor_requires_a_full_sync(self):
+        _, data = self.sync()
+        with self.settings(SNIPPET_TOMBSTONE_RETENTION=timedelta(0)):
+            self.assertEqual(self.sync(data['cursor'])[0], 410)
+
+    def test_purge_tombstones(self):
+        make_snippets(self.user, 2)
+        Snippet.objects.all().delete()
+        SnippetTombstone.objects.filter(id=SnippetTombstone.objects.first().id).update(
+            deleted_at=timezone.now() - timedelta(days=60))
+        call_command('purge_tombstones', stdout=io.StringIO())
+        self.assertEqual(SnippetTombstone.objects.count(), 1)
+
+
+class BulkDeleteTests(SnippetAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tag = Tag.objects.create(title='old')
+        self.snippets = make_snippets(self.user, 5, start=timezone.now() - timedelta(days=10))
+        Snippet.tag.through.objects.create(snippet_id=self.snippets[0].id, tag_id=self.tag.id)
+        self.foreign = make_snippets(User.objects.create_user(username='bob'), 1)[0]
+
+    def delete(self, body):
+        return self.client.post(reverse('delete-snippet-api'), body, format='json')
+
+    def test_deletes_a_list_of_ids_and_returns_a_delta(self):
+        ids = [self.snippets[1].id, self.snippets[2].id, self.foreign.id]
+        data = self.delete({'snippet_ids': ids}).json()['data']
+        self.assertEqual(sorted(data['deleted_ids']), ids[:2])
+        self.assertEqual((data['deleted_count'], data['total_count']), (2, 3))
+        self.assertNotIn('snippets', data)
+        self.assertTrue(Snippet.objects.filter(id=self.foreign.id).exists())
+
+    def test_deletes_by_tag_and_date(self):
+        data = self.delete({'tag': 'old'}).json()['data']
+        self.assertEqual(data['deleted_ids'], [self.snippets[0].id])
+        cutoff = self.snippets[3].created_at.isoformat()
+        data = self.delete({'created_before': cutoff}).json()['data']
+        self.assertEqual(sorted(data['deleted_ids']), [s.id for s in self.snippets[1:3]])
+        self.assertEqual(self.tag.snippets.count(), 0)
+
+    def test_include_remaining(self):
+        data = self.delete({'snippet_id': self.snippets[0].id, 'include_remaining': True}).json()['data']
+        self.assertEqual(len(data['snippets']), 4)
+
+    def test_rejects_bad_input(self):
+        self.assertEqual(self.delete({}).status_code, 400)
+        self.assertEqual(self.delete({'snippet_ids': ['x']}).status_code, 400)
+        self.assertEqual(self.delete({'created_after': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.delete({'snippet_id': self.foreign.id}).status_code, 400)
+        for body in ({'snippet_ids': {'id': 1}}, {'snippet_ids': [[1]]}, {'snippet_id': [1]}, {'tag': ['a']}):
+            with self.subTest(body=body):
+                self.assertEqual(self.delete(body).status_code, 400)
+
+    def test_accepts_a_single_id_for_the_list(self):
+        self.assertEqual(self.delete({'snippet_ids': self.snippets[0].id}).json()['data']['deleted_ids'],
+                         [self.snippets[0].id])
+
+
+class SnippetCounterTests(SnippetAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.bob = User.objects.create_user(username='bob')
+
+    def assertCounts(self, alice, bob):
+        self.assertEqual(verify_counters(), [])
+        self.assertEqual((get_snippet_count(self.user.pk), get_snippet_count(self.bob.pk)), (alice, bob))
+        self.assertEqual(get_snippet_count(), alice + bob)
+
+    def test_follow_every_write_path(self):
+        self.assertCounts(0, 0)
+        self.client.post(reverse('create-snippet-api'), {'title': 't', 'note': 'n', 'tag': []}, format='json')
+        snippets = make_snippets(self.user, 3) + make_snippets(self.bob, 2)
+        self.assertCounts(4, 2)
+        self.client.post(reverse('delete-snippet-api'), {'snippet_ids': [snippets[0].id, snippets[1].id]},
+                         format='json')
+        self.assertCounts(2, 2)
+        Snippet.objects.filter(id=snippets[-1].id).update(created_by=self.user)
+        self.assertCounts(3, 1)
+        self.bob.delete()
+        self.assertEqual(verify_counters(), [])
+        self.assertEqual(get_snippet_count(), 3)
+
+    def test_totals_come_from_the_counter(self):
+        make_snippets(self.user, 3)
+        SnippetCounter.objects.filter(user_id=SnippetCounter.ALL_USERS).update(snippet_count=42)
+        SnippetCounter.objects.filter(user_id=self.user.pk).update(snippet_count=40)
+        self.assertEqual(self.client.get(reverse('overview-api')).json()['data']['total_count'], 42)
+        token = RefreshToken.for_user(self.user).access_token
+        async_client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(async_client.get(reverse('async-overview-api')).json()['data']['total_count'], 42)
+        data = self.client.post(reverse('delete-snippet-api'), {'snippet_id': Snippet.objects.first().id},
+                                format='json').json()['data']
+        self.assertEqual(data['total_count'], 39)
+
+    def test_command_detects_and_repairs_drift(self):
+        make_snippets(self.user, 3)
+        SnippetCounter.objects.filter(user_id=self.user.pk).update(snippet_count=7)
+        with self.assertRaises(CommandError):
+            call_command('snippet_counters', check=True, stdout=io.StringIO(), stderr=io.StringIO())
+        call_command('snippet_counters', stdout=io.StringIO())
+        call_command('snippet_counters', check=True, stdout=io.StringIO())
+        self.assertCounts(3, 0)
+
+
+class ReplicaRouterTests(SnippetAPITestCase):
+
+    def test_routes_reads_only_inside_read_views(self):
+        router = ReplicaRouter()
+        with self.settings(SNIPPET_REPLICA_DATABASE='default'):
+            self.assertIsNone(router.db_for_read(Snippet))
+            with replica_reads():
+                self.assertEqual(router.db_for_read(Snippet), 'default')
+                self.assertIsNone(router.db_for_write(Snippet))
+            self.assertIsNone(router.db_for_read(Snippet))
+        with self.settings(SNIPPET_REPLICA_DATABASE='missing'), replica_reads():
+            self.assertIsNone(router.db_for_read(Snippet))
+
+    def test_read_views_use_the_replica(self):
+        token = RefreshToken.for_user(self.user).access_token
+        async_client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with mock.patch('admin_apps.app_snippet.routers.get_replica_alias', return_value=None) as alias:
+            self.client.post(reverse('create-snippet-api'), {'title': 't', 'note': 'n', 'tag': ['x']}, format='json')
+            self.assertFalse(alias.called)
+            for request in (lambda: self.client.get(reverse('overview-api')),
+                            lambda: self.client.get(reverse('list-tags-api')),
+                            lambda: self.client.get(reverse('export-snippet-api')),
+                            lambda: async_client.get(reverse('async-overview-api'))):
+                alias.reset_mock()
+                self.assertEqual(request().status_code, 200)
+                self.assertTrue(alias.called)
+
+
+class AsyncViewTests(SnippetAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        tag = Tag.objects.create(title='python')
+        self.snippets = make_snippets(self.user, 3, tags=[tag])
+        token = RefreshToken.for_user(self.user).access_token
+        self.async_client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_matches_the_sync_views(self):
+        for sync_name, async_name, args in (
+                ('overview-api', 'async-overview-api', []),
+                ('list-tags-api', 'async-list-tags-api', []),
+                ('snippet-details-api', 'async-snippet-details-api', [self.snippets[0].id])):
+            expected = self.client.get(reverse(sync_name, args=args), {'page_size': 2}).json()
+            actual = self.async_client.get(reverse(async_name, args=args), {'page_size': 2}).json()
+            self.assertEqual(actual, expected)
+
+        body = {'query': 'python', 'page_size': 2}
+        expected = self.client.post(reverse('filter-tags-api'), body, format='json').json()
+        actual = self.async_client.post(
+            reverse('async-filter-tags-api'), body, content_type='application/json').json()
+        self.assertEqual(actual, expected)
+
+    def test_rejects_malformed_filter_bodies_like_the_sync_view(self):
+        for body in ({'tag': ['python']}, {'query': {'q': 'python'}}, {'all': {'python': 1}}, {'any': [['python']]}):
+            with self.subTest(body=body):
+                expected = self.client.post(reverse('filter-tags-api'), body, format='json')
+                actual = self.async_client.post(
+                    reverse('async-filter-tags-api'), body, content_type='application/json')
+                self.assertEqual((actual.status_code, actual.json()), (400, expected.json()))
+                self.assertEqual(expected.status_code, 400)
+
+    def test_requires_a_valid_token(self):
+        self.assertEqual(Client().get(reverse('async-overview-api')).status_code, 401)
+        bad = Client(HTTP_AUTHORIZATION='Bearer nope')
+        self.assertEqual(bad.get(reverse('async-overview-api')).status_code, 401)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.async_client.get(reverse('async-overview-api')).status_code, 401)
+
+
+class SparseFieldsetTests(SnippetAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        tag = Tag.objects.create(title='python')
+        self.snippets = make_snippets(self.user, 3, tags=[tag])
+        self.detail_url = reverse('snippet-details-api', args=[self.snippets[0].id])
+
+    def request(self, send):
+        with CaptureQueriesContext(connection) as queries:
+            response = send()
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data'], [query['sql'] for query in queries]
+
+    def test_detail_skips_the_note_and_the_tags(self):
+        data, queries = self.request(lambda: self.client.get(self.detail_url, {'fields': 'title,id'}))
+        self.assertEqual(data, [{'id': self.snippets[0].id, 'title': 'snippet 0'}])
+        # validators + the snippet, no tag prefetch
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('"note"', queries[-1])
+
+        data, queries = self.request(lambda: self.client.get(self.detail_url, {'fields': 'tag'}))
+        self.assertEqual(data, [{'tag': ['python']}])
+        self.assertEqual(len(queries), 3)
+
+        token = RefreshToken.for_user(self.user).access_token
+        response = Client(HTTP_AUTHORIZATION=f'Bearer {token}').get(
+            reverse('async-snippet-details-api', args=[self.snippets[0].id]), {'fields': 'tag'})
+        self.assertEqual(response.json()['data'], data)
+
+    def test_list_endpoints_narrow_the_select(self):
+        data, queries = self.request(lambda: self.client.get(reverse('overview-api'), {'fields': 'id'}))
+        self.assertEqual(data['snippets'], [{'id': snippet.id} for snippet in reversed(self.snippets)])
+        self.assertNotIn('auth_user', queries[-1])
+
+        data, queries = self.request(lambda: self.client.post(
+            reverse('filter-tags-api'), {'tag': 'python', 'fields': ['title']}, format='json'))
+        self.assertEqual(data['snippets'][0], {'title': 'snippet 2'})
+        self.assertEqual(len(queries), 1)
+
+        data, _ = self.request(lambda: self.client.get(reverse('list-tags-api'), {'fields': 'title'}))
+        self.assertEqual(data, [{'title': 'python'}])
+        data, queries = self.request(lambda: self.client.get(reverse('sync-snippet-api'), {'fields': 'id'}))
+        self.assertEqual(data['changed'][0], {'id': self.snippets[0].id})
+        self.assertFalse(any('app_snippet_tag' in query for query in queries))
+        data, _ = self.request(lambda: self.client.get(
+            reverse('search-snippet-api'), {'q': 'note', 'fields': 'id', 'page_size': 1}))
+        self.assertEqual(list(data['snippets'][0]), ['id'])
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(self.detail_url, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['message'], 'Unknown fields: password')
+        response = self.client.post(reverse('filter-tags-api'), {'tag': 'python', 'fields': 'note'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class CompressedNoteTests(SnippetAPITestCase):
+    log = ''.join(f'2026-10-18 12:00:{i % 60:02d} INFO worker-{i % 8} handled request ✓\n' for i in range(500))
+
+    def stored(self, snippet):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT note FROM app_snippet_snippet WHERE id = %s', [snippet.id])
+            return bytes(cursor.fetchone()[0])
+
+    def test_large_notes_are_compressed(self):
+        large = Snippet.objects.create(title='log', note=self.log, created_by=self.user)
+        small = Snippet.objects.create(title='tip', note='short ✓', created_by=self.user)
+        self.assertTrue(self.stored(large).startswith(COMPRESSED))
+        self.assertLess(len(self.stored(large)), len(self.log.encode()) / 10)
+        self.assertEqual(self.stored(small), PLAIN + 'short ✓'.encode())
+
+        snippet = Snippet.objects.get(id=large.id)
+        self.assertIsInstance(snippet.__dict__['note'], bytes)
+        self.assertEqual(snippet.note, self.log)
+        snippet.title = 'renamed'
+        snippet.save()
+        self.assertEqual(Snippet.objects.get(id=large.id).note, self.log)
+        detail = self.client.get(reverse('snippet-details-api', args=[large.id])).json()['data'][0]
+        self.assertEqual(detail['note'], self.log)
+
+    def test_full_text_index_sees_the_text(self):
+        snippet = Snippet.objects.create(title='log', note=self.log + 'needle', created_by=self.user)
+        index_snippets([snippet])
+        search = lambda q: self.client.get(reverse('search-snippet-api'), {'q': q}).json()['data']
+        self.assertEqual(search('needle')['snippets'][0]['id'], snippet.id)
+        self.client.put(
+            reverse('update-snippet-api', args=[snippet.id]), {'note': self.log + 'haystack'}, format='json')
+        self.assertEqual(search('needle'), [])
+        self.assertEqual(search('haystack')['snippets'][0]['id'], snippet.id)
+        self.client.post(reverse('delete-snippet-api'), {'snippet_id': snippet.id}, format='json')
+        self.assertEqual(search('haystack'), [])
+
+    def test_list_endpoints_preview_the_note(self):
+        Tag.objects.create(title='logs')
+        snippet = Snippet.objects.create(title='log', note=self.log, created_by=self.user)
+        snippet.tag.set(Tag.objects.all())
+        overview = self.client.get(reverse('overview-api')).json()['data']['snippets'][0]
+        self.assertNotIn('note_preview', overview)
+        overview = self.client.get(reverse('overview-api'), {'note_preview': 30}).json()['data']['snippets'][0]
+        self.assertEqual(overview['note_preview'], self.log[:30])
+
+        body = {'tag': 'logs', 'note_preview': 100000}
+        filtered = self.client.post(reverse('filter-tags-api'), body, format='json').json()['data']['snippets'][0]
+        self.assertEqual(filtered['note_preview'], self.log[:1000])
+        self.assertEqual(preview_note(compress_note('✓' * 2000), 3), '✓✓✓')
+
+
+class FastPathSerializationTests(SnippetAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        tags = [Tag.objects.create(title=title) for title in ('python', 'django', 'ünïcode')]
+        self.snippets = make_snippets(self.user, 5, tags=tags)
+        Snippet.objects.filter(id=self.snippets[0].id).update(
+            title='line\u2028separator \U0001f40d', note='"quoted"\n</script>')
+
+    def test_matches_the_serializers(self):
+        queryset = Snippet.objects.order_by('-created_at', '-id')
+        expected = SnippetSerializerListWithLinks(queryset.select_related('created_by'), many=True).data
+        self.assertEqual(serialize_snippet_links(snippet_link_rows(queryset)), expected)
+
+        # The note is left out unless a preview is asked for
+        expected = SnippetSerializerDetail(queryset.prefetch_related('tag'), many=True).data
+        rows = list(snippet_detail_rows(queryset, preview=4))
+        titles = group_tag_titles(tag_titles_queryset([row.id for row in rows]))
+        self.assertEqual(
+            serialize_snippet_details(rows, titles, preview=4),
+            [{'id': item['id'], 'title': item['title'], 'tag': item['tag'], 'note_preview': item['note'][:4]}
+             for item in expected])
+
+    def test_renderer_output_is_identical(self):
+        response = self.client.get(reverse('overview-api'))
+        data = dict(response.data, extra={1: Decimal('1.50'), 'at': timezone.now(), 'none': None})
+        expected = JSONRenderer().render(data)
+        self.assertEqual(TimedFastJSONRenderer().render(data), expected)
+        with mock.patch('admin_apps.app_snippet.renderers.orjson', None):
+            self.assertEqual(TimedFastJSONRenderer().render(data), expected)
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def test_renderer_falls_back_on_what_orjson_refuses(self):
+        data = {'big': 2 ** 70, 'negative': -2 ** 64}
+        self.assertEqual(TimedFastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_only_list_views_render_with_orjson(self):
+        self.assertIsInstance(self.client.get(reverse('overview-api')).accepted_renderer, TimedFastJSONRenderer)
+        snippet = Snippet.objects.create(title='t', note='n', created_by=self.user)
+        detail = self.client.get(reverse('snippet-details-api', args=[snippet.id]))
+        self.assertNotIsInstance(detail.accepted_renderer, FastJSONRenderer)
+
+
+class AuthUserCacheTests(SnippetAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.jwt_client = Client(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def user_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.jwt_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [query for query in queries if 'FROM "auth_user"' in query['sql']]
+
+    def test_user_is_loaded_once(self):
+        for url in (reverse('overview-api'), reverse('async-overview-api')):
+            user_cache.clear()
+            self.assertEqual(len(self.user_queries(url)), 1)
+            self.assertEqual(self.user_queries(url), [])
+
+    def test_entries_expire(self):
+        self.jwt_client.get(reverse('overview-api'))
+        with mock.patch('time.monotonic', return_value=time.monotonic() + 3600):
+            self.assertEqual(len(self.user_queries(reverse('overview-api'))), 1)
+
+    def test_deactivation_applies_at_once(self):
+        self.assertEqual(self.jwt_client.get(reverse('overview-api')).status_code, 200)
+        self.assertEqual(self.jwt_client.get(reverse('async-overview-api')).status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.jwt_client.get(reverse('overview-api')).status_code, 401)
+        self.assertEqual(self.jwt_client.get(reverse('async-overview-api')).status_code, 401)
+
+    def test_version_bumps_reach_other_processes(self):
+        # This process still holds the user, another one deactivated it and bumped its version
+        self.assertEqual(self.jwt_client.get(reverse('overview-api')).status_code, 200)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.jwt_client.get(reverse('overview-api')).status_code, 200)
+        bump_user_version(self.user.pk)
+        self.assertEqual(self.jwt_client.get(reverse('overview-api')).status_code, 401)
+        self.assertEqual(self.jwt_client.get(reverse('async-overview-api')).status_code, 401)
+
+    @mock.patch.object(jwt_settings, 'CHECK_REVOKE_TOKEN', True)
+    def test_password_check_runs_on_cached_users_when_enabled(self):
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.assertEqual(client.get(reverse('overview-api')).status_code, 200)
+        self.user.set_password('new-secret')
+        self.user.save()
+        self.assertEqual(client.get(reverse('overview-api')).status_code, 401)
+
+
+@no_replica
+class BenchmarkCommandTests(TestCase):
+
+    def test_seed_snippets(self):
+        call_command('seed_snippets', users=3, snippets=50, tags=10, batch_size=20, seed=1,
+                     stdout=io.StringIO())
+        self.assertEqual(User.objects.filter(username__startswith='seed-user-').count(), 3)
+        self.assertEqual(Snippet.objects.count(), 50)
+        counts = list(Tag.objects.order_by('id').values_list('snippet_count', flat=True))
+        self.assertGreater(counts[0], counts[-1])
+
+    def test_bench_snippets_writes_a_json_report(self):
+        call_command('seed_snippets', users=1, snippets=20, tags=5, seed=1, stdout=io.StringIO())
+        stdout = io.StringIO()
+        call_command('bench_snippets', requests=3, concurrency=1,
+                     routes=['overview-api', 'snippet-details-api', 'delete-snippet-api'],
+                     stdout=stdout, stderr=io.StringIO())
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(set(report['routes']), {'overview-api', 'snippet-details-api', 'delete-snippet-api'})
+        overview = report['routes']['overview-api']
+        self.assertEqual((overview['requests'], overview['errors']), (3, 0))
+        self.assertLessEqual(overview['p50_ms'], overview['p99_ms'])
+        self.assertGreater(overview['queries_per_request'], 0)
+
+    def test_bench_snippets_cleans_up_and_never_borrows_a_user(self):
+        call_command('bench_snippets', requests=2, concurrency=1,
+                     routes=['user-create-api', 'create-snippet-api', 'delete-snippet-api'],
+                     stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertFalse(User.objects.filter(username__startswith='bench').exists())
+        self.assertFalse(Snippet.objects.exists())
+
+        alice = User.objects.create_user('alice')
+        Snippet.objects.create(title='mine', note='n', created_by=alice)
+        with self.assertRaisesMessage(CommandError, 'already exists'):
+            call_command('bench_snippets', requests=1, username='alice', stdout=io.StringIO(), stderr=io.StringIO())
+        alice.refresh_from_db()
+        self.assertFalse(alice.is_staff)
+        self.assertEqual(Snippet.objects.count(), 1)
+
+    def test_bench_serialization(self):
+        call_command('seed_snippets', users=1, snippets=20, tags=5, seed=1, stdout=io.StringIO())
+        stdout = io.StringIO()
+        call_command('bench_serialization', rows=10, repeat=1, stdout=stdout, stderr=io.StringIO())
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(report['rows'], 10)
+        self.assertEqual(set(report['payloads']), {'overview', 'filter-tags'})
+        self.assertGreater(report['payloads']['overview']['fast_path_rows_per_second'], 0)
+
+
+@no_replica
+class ConcurrencyBenchmarkTests(TransactionTestCase):
+    # The worker threads open their own connections, which only see committed rows
+
+    def test_bench_concurrency(self):
+        call_command('seed_snippets', users=1, snippets=20, tags=5, seed=1, stdout=io.StringIO())
+        stdout = io.StringIO()
+        call_command('bench_concurrency', requests=2, readers=1, writers=1, stdout=stdout, stderr=io.StringIO())
+        report = json.loads(stdout.getvalue())
+        self.assertEqual((report['read']['requests'], report['write']['requests']), (2, 2))
+        self.assertEqual(report['meta']['replica'], None)
+        self.assertIn('locked_errors', report['write'])
+        self.assertFalse(User.objects.filter(username='bench').exists())
+
+
+class ServeCommandTests(SnippetAPITestCase):
+
+    def test_warm_up_times_every_step(self):
+        timings = warm_up(get_internal_wsgi_application())
+        self.assertEqual(set(timings), {'url_resolver', 'serializers', 'database', 'request'})
+        self.assertEqual(route_stats.snapshot()['routes'], {})
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_refuses_several_workers_on_a_process_local_cache(self):
+        with self.assertRaisesMessage(CommandError, 'LocMemCache'):
+            call_command('serve', workers=2, stdout=io.StringIO())
+
+    def test_gunicorn_preloads_the_application_into_threaded_workers(self):
+        server = SnipBoxServer(
+            {'bind': '127.0.0.1:0', 'workers': 2, 'threads': 4, 'timeout': 20, 'keepalive': 3, 'warmup': True})
+        self.assertTrue(server.cfg.preload_app)
+        self.assertEqual(server.cfg.worker_class_str, 'gthread')
+        self.assertEqual((server.cfg.workers, server.cfg.threads), (2, 4))
+        self.assertEqual((server.cfg.timeout, server.cfg.keepalive), (20, 3))
+        self.assertIs(server.wsgi(), server.wsgi())
+
+    def test_hooks_report_the_first_request_of_a_worker(self):
+        worker = SimpleNamespace(pid=1, log=mock.Mock())
+        first, second = SimpleNamespace(path='/first'), SimpleNamespace(path='/second')
+        pre_request(worker, first)
+        pre_request(worker, second)
+        post_request(worker, second, {}, None)
+        post_request(worker, first, {}, None)
+        pre_request(worker, second)
+        post_request(worker, second, {}, None)
+        self.assertEqual(worker.log.info.call_count, 1)
+        self.assertEqual(worker.log.info.call_args.args[2], '/first')
+
+
+class InstrumentationTests(SnippetAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        route_stats.clear()
+        self.addCleanup(route_stats.clear)
+        make_snippets(self.user, 3)
+        token = RefreshToken.for_user(self.user).access_token
+        self.jwt_client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def timings(self, response):
+        timings = {}
+        for part in response['Server-Timing'].split(', '):
+            name, duration = part.split(';')[:2]
+            timings[name] = float(duration.removeprefix('dur='))
+        return timings
+
+    def test_server_timing_header(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.jwt_client.get(reverse('overview-api'))
+        self.assertIn(f'desc="{len(queries)} queries"', response['Server-Timing'])
+        timings = self.timings(response)
+        self.assertEqual(set(timings), {'db', 'auth', 'serialize', 'render', 'total'})
+        self.assertTrue(all(timings[name] > 0 for name in ('db', 'auth', 'serialize', 'render')))
+        self.assertGreaterEqual(timings['total'], timings['db'])
+
+    def test_async_views_are_measured(self):
+        response = self.jwt_client.get(reverse('async-overview-api'))
+        self.assertGreater(self.timings(response)['db'], 0)
+
+    def test_stats_and_slow_log(self):
+        admin = APIClient()
+        admin.force_authenticate(User.objects.create_user(username='root', is_staff=True))
+        with self.settings(SNIPPET_SLOW_REQUEST_MS=0), self.assertLogs(
+                'admin_apps.app_snippet.instrumentation', 'WARNING'):
+            self.jwt_client.get(reverse('overview-api'))
+            self.jwt_client.get(reverse('overview-api'))
+        stats = admin.get(reverse('perf-stats-api')).json()['data']
+        route = stats['routes']['GET /api/snippet/overview/']
+        self.assertEqual((route['count'], route['histogram']['total']), (2, 2))
+        self.assertEqual(stats['slow_requests'][0]['route'], 'GET /api/snippet/overview/')
+        self.assertTrue(stats['slow_requests'][0]['worst_sql'])
@@ -1,13 +1,25 @@
 from django.urls import path, include
 from .views import *
+from .async_views import *
 
 urlpatterns = [
     path('auth/register/', CreateUserAPI.as_view(), name='user-create-api'),
     path('overview/', OverviewAPI.as_view(), name='overview-api'),
     path('create/', SnippetCreateAPIView.as_view(), name='create-snippet-api'),
     path('tags/', TagListAPI.as_view({'get': 'list'}), name='list-tags-api'),
+    path('tags/autocomplete/', TagAutocompleteAPI.as_view(), name='tag-autocomplete-api'),
+    path('bulk-import/', BulkImportSnippetAPI.as_view(), name='bulk-import-snippet-api'),
+    path('export/', ExportSnippetAPI.as_view(), name='export-snippet-api'),
     path('delete-snippet/', DeleteSnippetAPI.as_view(), name='delete-snippet-api'),
     path('detail/<int:snippet_id>/', DetailSnippetAPI.as_view(), name='snippet-details-api'),
     path('update/<int:snippet_id>/', UpdateSnippetAPI.as_view(), name='update-snippet-api'),
+    path('search/', SearchSnippetAPI.as_view(), name='search-snippet-api'),
     path('filter-tags/', FilterByTagAPI.as_view(), name='filter-tags-api'),
+    path('sync/', SyncSnippetAPI.as_view(), name='sync-snippet-api'),
+    path('cache-stats/', CacheStatsAPI.as_view(), name='cache-stats-api'),
+    path('perf-stats/', PerfStatsAPI.as_view(), name='perf-stats-api'),
+    path('async/overview/', AsyncOverviewAPI.as_view(), name='async-overview-api'),
+    path('async/tags/', AsyncTagListAPI.as_view(), name='async-list-tags-api'),
+    path('async/detail/<int:snippet_id>/', AsyncDetailSnippetAPI.as_view(), name='async-snippet-details-api'),
+    path('async/filter-tags/', AsyncFilterByTagAPI.as_view(), name='async-filter-tags-api'),
 ]
@@ -1,16 +1,99 @@
 # views.py
+from django.conf import settings
+from django.db import router, transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
-from rest_framework.permissions import IsAuthenticated
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.views import APIView
 from rest_framework import viewsets
 from rest_framework import status
 from rest_framework.response import Response
 from .models import *
 from .serializers import *
+from .pagination import InvalidCursor, KeysetPaginator
+from .bulk import import_ndjson
+from .export import EXPORT_FORMATS, iter_snippet_rows
+from .renderers import CSVRenderer, NDJSONRenderer, TimedFastJSONRenderer
+from .search import search_snippets, unindex_snippets
+from .tags import autocomplete_tags, filter_by_tags, parse_tag_query
+from .cache import GLOBAL_SCOPE, USER_SCOPE, bump_generation, cache_response, cache_stats
+from .conditional import detail_condition, detail_etag, overview_condition, overview_etag, overview_state
+from .counters import get_snippet_count
+from .sync import CursorExpired, get_changes
+from .instrumentation import route_stats
+from .routers import ReplicaReadMixin
 
 def generate_api_response(success, data, message):
     return {"status": success, "message": message, "data": data, }
 
+def get_bool_param(data, key):
+    value = data.get(key, False)
+    if isinstance(value, str):
+        return value.lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+def parse_datetime_param(data, key):
+    value = data.get(key)
+    if not value:
+        return None
+    parsed = parse_datetime(value) if isinstance(value, str) else None
+    if parsed is None:
+        raise ValidationError(f"Invalid datetime for {key}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+# JSON values a single-valued parameter may hold
+SCALAR_TYPES = (str, int, float)
+
+def get_list_param(data, key):
+    """
+    Values of `key`: repeated query/form values, a JSON list of scalars or a single scalar.
+    """
+    if hasattr(data, 'getlist'):
+        return data.getlist(key)
+    value = data.get(key)
+    if value is None or value == '':
+        return []
+    values = value if isinstance(value, list) else [value]
+    if not all(isinstance(item, SCALAR_TYPES) for item in values):
+        raise ValidationError(f"Invalid {key}, expected a value or a list of values")
+    return values
+
+def get_scalar_param(data, key):
+    value = data.get(key)
+    if value is not None and not isinstance(value, SCALAR_TYPES):
+        raise ValidationError(f"Invalid {key}, expected a single value")
+    return value
+
+def get_fields_param(data, allowed):
+    """
+    Output fields requested with `fields` (comma separated or repeated), in `allowed` order.
+    """
+    requested = {name.strip() for value in get_list_param(data, 'fields') for name in str(value).split(',')}
+    requested.discard('')
+    if not requested:
+        return list(allowed)
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise ValidationError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return [name for name in allowed if name in requested]
+
+def get_preview_param(data):
+    """
+    Characters of note preview requested with `note_preview`, list endpoints leave the note out otherwise.
+    """
+    maximum = getattr(settings, 'SNIPPET_NOTE_PREVIEW_MAX', 1000)
+    try:
+        length = int(data.get('note_preview') or 0)
+    except (TypeError, ValueError):
+        length = 0
+    return max(0, min(length, maximum))
+
 class CreateUserAPI(APIView):
     """
     API for creating a new user.
@@ -32,74 +115,123 @@ class CreateUserAPI(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class OverviewAPI(APIView):
+class OverviewAPI(ReplicaReadMixin, APIView):
     """
     API for getting the total number of snippets and list all available snippets with a hyperlink to respective detail APIs.
     """
     permission_classes = [IsAuthenticated]
+    renderer_classes = [TimedFastJSONRenderer, BrowsableAPIRenderer]
 
+    @overview_condition
+    @cache_response(GLOBAL_SCOPE, validator=overview_etag)
     def get(self, request):
         try:
-            total_snippets = Snippet.objects.filter().count()
-            snippets = Snippet.objects.all()
-            snippet_serializer = SnippetSerializerListWithLinks(snippets, many=True)
-            if snippets:
-                serializer = SnippetSerializerListWithLinks(snippets, many=True)
+            paginator = KeysetPaginator(request.query_params)
+            preview = get_preview_param(request.query_params)
+            fields = get_fields_param(request.query_params, SNIPPET_LINK_FIELDS)
+            # Read by the same statement that produced the ETag
+            total_snippets = overview_state(request)['count']
+            page = paginator.paginate(snippet_link_rows(Snippet.objects.all(), preview, fields))
+            if page.items:
                 data = {
                 "total_count": total_snippets,
-                "snippets": snippet_serializer.data,
+                "snippets": serialize_snippet_links(page.items, preview, fields),
+                "next": page.next_cursor,
+                "previous": page.previous_cursor,
                 }
                 response_data=generate_api_response(True, data, "successfully retrieved snippet list with links")
             else:
                 response_data = generate_api_response(False, [], "No data found")
             return Response(response_data, status=200)
 
+        except InvalidCursor:
+            response_data = generate_api_response(False, [], "Invalid cursor")
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+        except ValidationError as error:
+            response_data = generate_api_response(False, [], str(error.detail[0]))
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
         except Snippet.DoesNotExist:
             return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
         
 
-class DetailSnippetAPI(APIView):
+class DetailSnippetAPI(ReplicaReadMixin, APIView):
     """
     API for snippet details
     """
     permission_classes = [IsAuthenticated]
     serializer_class = SnippetSerializer
 
+    @detail_condition
+    @cache_response(USER_SCOPE, validator=detail_etag)
     def get(self, request, snippet_id):
         try:
-            snippet = Snippet.objects.filter(id=snippet_id, created_by=request.user)
+            fields = get_fields_param(request.query_params, SnippetSerializerDetail.Meta.fields)
+            snippet = sparse_snippets(Snippet.objects.filter(id=snippet_id, created_by=request.user), fields)
             if snippet:
-                serializer = SnippetSerializerDetail(snippet, many=True)
+                serializer = SnippetSerializerDetail(snippet, many=True, fields=fields)
                 response_data=generate_api_response(True, serializer.data, "successfully retrieved snippet details")
             else:
                 response_data = generate_api_response(False, [], "No data found")
             return Response(response_data, status=200)
+        except ValidationError as error:
+            response_data = generate_api_response(False, [], str(error.detail[0]))
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
         except Snippet.DoesNotExist:
             return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
         
-class TagListAPI(viewsets.ModelViewSet):
+class TagListAPI(ReplicaReadMixin, viewsets.ModelViewSet):
     """
     API view to list tags
     """
     permission_classes = [IsAuthenticated]
     serializer_class = TagSerializer
 
+    @cache_response(GLOBAL_SCOPE)
     def list(self, request, *args, **kwargs):
         try:
-            tags = Tag.objects.all()
-            serializer = self.get_serializer(tags,many=True, context={"request": request})
+            fields = get_fields_param(request.query_params, TagSerializer.Meta.fields)
+            tags = Tag.objects.only(*fields)
+            serializer = self.get_serializer(tags,many=True, context={"request": request}, fields=fields)
             if serializer.data:
                 response_data = generate_api_response(True, serializer.data, "successfully retrieved tags list")
             else:
                 response_data = generate_api_response(
                     False, [], "No data found")
             return Response(response_data, status=200)
+        except ValidationError as error:
+            response_data = generate_api_response(False, [], str(error.detail[0]))
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
         except Exception as error:
             response_data = generate_api_response(
                 False, [], f"An error occurred: {str(error)}")
             return Response(response_data, status=500)
 
 
+class TagAutocompleteAPI(ReplicaReadMixin, APIView):
+    """
+    API for the titles of tags starting with `q`, most used first, at most `limit` of them
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        prefix = request.query_params.get('q', '').strip()
+        if not prefix:
+            response_data = generate_api_response(False, [], "Prefix is required")
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+        default = getattr(settings, 'SNIPPET_TAG_AUTOCOMPLETE_LIMIT', 10)
+        try:
+            limit = int(request.query_params.get('limit', default))
+        except (TypeError, ValueError):
+            limit = default
+        limit = max(1, min(limit, getattr(settings, 'SNIPPET_TAG_AUTOCOMPLETE_MAX', 50)))
+        tags = [{"title": title, "snippet_count": count} for title, count in autocomplete_tags(prefix, limit)]
+        if tags:
+            response_data = generate_api_response(True, tags, "successfully retrieved matching tags")
+        else:
+            response_data = generate_api_response(False, [], "No data found")
+        return Response(response_data, status=200)
+
+
 class SnippetCreateAPIView(APIView):
     """
     API to create a new snippet with tags.
@@ -117,6 +249,7 @@ class SnippetCreateAPIView(APIView):
                 
                 # Create the Snippet
                 snippet = serializer.create(validated_data)
+                bump_generation(request.user.pk)
                 tag_titles = [tag.title for tag in snippet.tag.all()]
                 datresponse={
                     'title': snippet.title,
@@ -135,27 +268,102 @@ class SnippetCreateAPIView(APIView):
             response_data = generate_api_response(False, [], f"An error occurred: {str(error)}")
             return Response(response_data, status=500)
 
+class BulkImportSnippetAPI(APIView):
+    """
+    API to create snippets in bulk from an NDJSON body, one snippet object per line.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        try:
+            result = import_ndjson(request.stream, request.user)
+            if result['created']:
+                bump_generation(request.user.pk)
+            if result['created'] or not result['failed']:
+                response_data = generate_api_response(True, result, "successfully imported the snippets")
+                return Response(response_data, status=200)
+            else:
+                response_data = generate_api_response(False, result, "No valid snippets found")
+                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as error:
+            response_data = generate_api_response(False, [], f"An error occurred: {str(error)}")
+            return Response(response_data, status=500)
+
+class ExportSnippetAPI(ReplicaReadMixin, APIView):
+    """
+    API to stream every snippet of the current user as NDJSON (default) or CSV (?format=csv).
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+
+    def get(self, request):
+        renderer = request.accepted_renderer
+        # The rows are read after dispatch() returns, pin them to the database chosen now
+        rows = iter_snippet_rows(request.user, using=router.db_for_read(Snippet))
+        response = StreamingHttpResponse(
+            EXPORT_FORMATS[renderer.format](rows), content_type=renderer.media_type)
+        response['Content-Disposition'] = f'attachment; filename="snippets.{renderer.format}"'
+        return response
+
 class DeleteSnippetAPI(APIView):
     """
-    API to delete a selected snippet and return rest of the snippets
+    API to delete snippets selected by `snippet_id`, a `snippet_ids` list, a `tag` and/or a
+    `created_before`/`created_after` range. Returns the deleted ids and the remaining count,
+    plus the remaining snippets when `include_remaining` is set
     """
     permission_classes = [IsAuthenticated]
     serializer_class = SnippetSerializer
 
     def post(self, request):
         try:
-            snippet_id=request.data.get("snippet_id","")
-            snippet = Snippet.objects.filter(id=snippet_id, created_by=request.user)
-            if snippet:
-                snippet.delete()
-                # Return the updated list of snippets
+            snippet_ids = get_list_param(request.data, 'snippet_ids')
+            if get_scalar_param(request.data, "snippet_id"):
+                snippet_ids.append(request.data.get("snippet_id"))
+            if not all(str(snippet_id).isdigit() for snippet_id in snippet_ids):
+                raise ValidationError("Invalid snippet id")
+            tag = get_scalar_param(request.data, "tag")
+            created_before = parse_datetime_param(request.data, "created_before")
+            created_after = parse_datetime_param(request.data, "created_after")
+            if not (snippet_ids or tag or created_before or created_after):
+                response_data = generate_api_response(False, [], "Snippet id is not found")
+                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+            snippet = Snippet.objects.filter(created_by=request.user)
+            if snippet_ids:
+                snippet = snippet.filter(id__in=snippet_ids)
+            if tag:
+                snippet = filter_by_tags(snippet, [tag])
+            if created_before:
+                snippet = snippet.filter(created_at__lt=created_before)
+            if created_after:
+                snippet = snippet.filter(created_at__gte=created_after)
+
+            with transaction.atomic():
+                deleted_ids = unindex_snippets(snippet)
+                if deleted_ids:
+                    # Not `snippet` again: a match inserted since the read would go unreported
+                    Snippet.objects.filter(id__in=deleted_ids).only('id').delete()
+            if deleted_ids:
+                bump_generation(request.user.pk)
                 remaining_snippets = Snippet.objects.filter(created_by=request.user)
-                serializer = SnippetSerializerDetail(remaining_snippets, many=True)
-                response_data = generate_api_response(True, serializer.data, "Given snippet is deleted")
+                data = {
+                "deleted_ids": deleted_ids,
+                "deleted_count": len(deleted_ids),
+                "total_count": get_snippet_count(request.user.pk),
+                }
+                if get_bool_param(request.data, "include_remaining"):
+                    preview = get_preview_param(request.data)
+                    rows = list(snippet_detail_rows(remaining_snippets.order_by('-created_at', '-id'), preview))
+                    titles = group_tag_titles(tag_titles_queryset([row.id for row in rows]))
+                    data["snippets"] = serialize_snippet_details(rows, titles, preview)
+                response_data = generate_api_response(True, data, "Given snippet is deleted")
                 return Response(response_data, status=200)
             else:
                 response_data = generate_api_response(False, [], "Snippet id is not found")
                 return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+        except ValidationError as error:
+            response_data = generate_api_response(False, [], str(error.detail[0]))
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
         except Exception as error:
             response_data = generate_api_response(False, [], f"An error occurred: {str(error)}")
             return Response(response_data, status=500)
@@ -173,6 +381,7 @@ class UpdateSnippetAPI(APIView):
                 serializer = SnippetSerializerDetail(snippet[0], data=request.data, partial=True)
                 if serializer.is_valid():
                     serializer.save()
+                    bump_generation(snippet[0].created_by_id)
                 response_data = generate_api_response(True, serializer.data, "Given snippet data updated")
                 return Response(response_data, status=200)
             else:
@@ -182,22 +391,43 @@ class UpdateSnippetAPI(APIView):
             response_data = generate_api_response(
                 False, [], f"An error occurred: {str(error)}")
 
-class FilterByTagAPI(APIView):
+class FilterByTagAPI(ReplicaReadMixin, APIView):
     """
-    API to list snippets by selected tag
+    API to list snippets by tags: a single `tag`, a `query` such as "python AND django NOT legacy",
+    or explicit `all`, `any` and `none` tag lists
     """
     permission_classes = [IsAuthenticated]
+    renderer_classes = [TimedFastJSONRenderer, BrowsableAPIRenderer]
     serializer_class = SnippetSerializerDetail
 
     def post(self, request):
         try:
-            tag=request.data.get('tag','')
-            tagitem=Tag.objects.filter(title=request.data.get('tag',''))
-            if tagitem:
-                snippet = Snippet.objects.filter(tag=tagitem[0], created_by=request.user)
-                if snippet:
-                    snippet_serializer = SnippetSerializerDetail(snippet, many=True)
-                    response_data = generate_api_response(True, snippet_serializer.data, "Snippet list for given tag")
+            paginator = KeysetPaginator(request.data)
+            preview = get_preview_param(request.data)
+            fields = get_fields_param(request.data, SNIPPET_DETAIL_FIELDS)
+            required = get_list_param(request.data, 'all')
+            optional = get_list_param(request.data, 'any')
+            groups = [optional] if optional else []
+            excluded = get_list_param(request.data, 'none')
+            if get_scalar_param(request.data, 'tag'):
+                required.append(request.data.get('tag'))
+            if get_scalar_param(request.data, 'query'):
+                parsed = parse_tag_query(str(request.data.get('query')))
+                required, groups, excluded = required + parsed[0], groups + parsed[1], excluded + parsed[2]
+            if required or groups:
+                snippet = filter_by_tags(
+                    Snippet.objects.filter(created_by=request.user), required, groups, excluded)
+                page = paginator.paginate(snippet_detail_rows(snippet, preview, fields))
+                if page.items:
+                    titles = {}
+                    if 'tag' in fields:
+                        titles = group_tag_titles(tag_titles_queryset([row.id for row in page.items]))
+                    data = {
+                    "snippets": serialize_snippet_details(page.items, titles, preview, fields),
+                    "next": page.next_cursor,
+                    "previous": page.previous_cursor,
+                    }
+                    response_data = generate_api_response(True, data, "Snippet list for given tag")
                     return Response(response_data, status=200)
                 else:
                     response_data = generate_api_response(False, [], "No snippets available")
@@ -205,6 +435,105 @@ class FilterByTagAPI(APIView):
             else:
                 response_data = generate_api_response(False, [], "No tag available")
                 return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+        except InvalidCursor:
+            response_data = generate_api_response(False, [], "Invalid cursor")
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+        except ValidationError as error:
+            response_data = generate_api_response(False, [], str(error.detail[0]))
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
         except Exception as error:
             response_data = generate_api_response(
-                False, [], f"An error occurred: {str(error)}")
\ No newline at end of file
+                False, [], f"An error occurred: {str(error)}")
+            return Response(response_data, status=500)
+
+class SearchSnippetAPI(ReplicaReadMixin, APIView):
+    """
+    API for full-text search over the title and note of the current user's snippets
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = SnippetSerializerDetail
+
+    def get(self, request):
+        try:
+            query = request.query_params.get('q', '').strip()
+            if not query:
+                response_data = generate_api_response(False, [], "Search query is required")
+                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+            fields = get_fields_param(request.query_params, SnippetSerializerDetail.Meta.fields)
+            # created_at keys the cursor of the non-FTS fallback
+            queryset = sparse_snippets(Snippet.objects.all(), fields, required=('id', 'created_at'))
+            page = search_snippets(request.user, query, request.query_params, queryset)
+            if page.items:
+                snippet_serializer = SnippetSerializerDetail(page.items, many=True, fields=fields)
+                data = {
+                "snippets": snippet_serializer.data,
+                "next": page.next_cursor,
+                }
+                response_data = generate_api_response(True, data, "Snippet list for given search")
+            else:
+                response_data = generate_api_response(False, [], "No snippets available")
+            return Response(response_data, status=200)
+        except InvalidCursor:
+            response_data = generate_api_response(False, [], "Invalid cursor")
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+        except ValidationError as error:
+            response_data = generate_api_response(False, [], str(error.detail[0]))
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as error:
+            response_data = generate_api_response(False, [], f"An error occurred: {str(error)}")
+            return Response(response_data, status=500)
+
+class SyncSnippetAPI(ReplicaReadMixin, APIView):
+    """
+    API to fetch the current user's snippets changed or deleted since a `since` cursor
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = SnippetSerializerSync
+
+    def get(self, request):
+        try:
+            fields = get_fields_param(request.query_params, SnippetSerializerSync.Meta.fields)
+            # The cursor is built from the last row's change_seq
+            queryset = sparse_snippets(Snippet.objects.all(), fields, required=('id', 'change_seq'))
+            page = get_changes(request.user, request.query_params, queryset)
+            data = {
+            "changed": SnippetSerializerSync(page.changed, many=True, fields=fields).data,
+            "deleted": page.deleted,
+            "cursor": page.cursor,
+            "has_more": page.has_more,
+            }
+            response_data = generate_api_response(True, data, "successfully retrieved snippet changes")
+            return Response(response_data, status=200)
+        except InvalidCursor:
+            response_data = generate_api_response(False, [], "Invalid cursor")
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+        except CursorExpired:
+            response_data = generate_api_response(False, [], "Cursor expired, a full sync is required")
+            return Response(response_data, status=status.HTTP_410_GONE)
+        except ValidationError as error:
+            response_data = generate_api_response(False, [], str(error.detail[0]))
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as error:
+            response_data = generate_api_response(False, [], f"An error occurred: {str(error)}")
+            return Response(response_data, status=500)
+
+class CacheStatsAPI(APIView):
+    """
+    API for the response cache hit and miss counters of the process serving the request
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        response_data = generate_api_response(True, cache_stats.snapshot(), "successfully retrieved cache stats")
+        return Response(response_data, status=200)
+
+
+class PerfStatsAPI(APIView):
+    """
+    API for the rolling per-route latency histograms and the recent slow requests
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        response_data = generate_api_response(True, route_stats.snapshot(), "successfully retrieved performance stats")
+        return Response(response_data, status=200)
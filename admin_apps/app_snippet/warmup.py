@@ -0,0 +1,85 @@
+# warmup.py
+import io
+import time
+from wsgiref.util import setup_testing_defaults
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.urls import get_resolver, reverse
+
+from .counters import get_snippet_count
+from .instrumentation import route_stats
+from .models import Snippet
+from .routers import get_serving_aliases
+from .serializers import *
+from .tags import tag_index
+
+WARM_SERIALIZERS = (
+    UserSerializer, TagSerializer, SnippetSerializerListWithLinks, SnippetSerializer,
+    SnippetSerializerDetail, SnippetSerializerSync,
+)
+
+
+def warm_url_resolver():
+    # Imports every urlconf and view module and builds the reverse lookup tables
+    get_resolver().reverse_dict
+
+
+def warm_serializers():
+    for model in apps.get_models():
+        model._meta.get_fields()
+    for serializer_class in WARM_SERIALIZERS:
+        serializer_class().fields
+
+
+def warm_database():
+    """
+    Open the connections requests use and read the pages the list endpoints start with, so they are in
+    the OS page cache, then load the tag autocomplete index.
+    """
+    for alias in get_serving_aliases():
+        connections[alias].ensure_connection()
+    get_snippet_count()
+    list(snippet_link_rows(Snippet.objects.order_by('-created_at', '-id'))[:50])
+    tag_index.load()
+
+
+def warm_request(application):
+    """
+    Send one unauthenticated request through the whole middleware and view stack.
+    """
+    environ = {
+        'PATH_INFO': reverse('overview-api'),
+        'HTTP_HOST': settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'localhost',
+        'wsgi.errors': io.StringIO(),
+    }
+    setup_testing_defaults(environ)
+    response = application(environ, lambda status, headers, exc_info=None: None)
+    try:
+        b''.join(response)
+    finally:
+        response.close()
+    route_stats.clear()
+
+
+def warm_up(application):
+    """
+    Run every warmup step and return {step: milliseconds}. Connections are closed at the end,
+    so that a process forked afterwards does not share them.
+    """
+    steps = (
+        ('url_resolver', warm_url_resolver),
+        ('serializers', warm_serializers),
+        ('database', warm_database),
+        ('request', lambda: warm_request(application)),
+    )
+    timings = {}
+    try:
+        for name, step in steps:
+            started = time.perf_counter()
+            step()
+            timings[name] = round((time.perf_counter() - started) * 1000, 3)
+    finally:
+        connections.close_all()
+    return timings